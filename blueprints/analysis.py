@@ -1,22 +1,21 @@
-from flask import Blueprint, request, jsonify, send_file, current_app
+from flask import Blueprint, request, jsonify, send_file, current_app, Response
 from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled, NoTranscriptFound
-import re
 import os
-import google.generativeai as genai
-from googleapiclient.discovery import build
 import json
-from transformers import pipeline
-from sentence_transformers import SentenceTransformer
-import umap
-import hdbscan
-import numpy as np
-from fpdf import FPDF
 from markdown_it import MarkdownIt
 from io import BytesIO
-import requests
-from collections import Counter
-import string
 from dotenv import load_dotenv
+from services.analysis_format import encode_analysis, maybe_gzip, negotiate_analysis_format
+from services.cache import SQLiteCache, all_cache_stats, hash_key
+from services.comment_store import CommentStore
+from services.gemini import GEMINI_MODEL_NAME, GeminiBlockedError, cached_cost_analysis, cost_analysis, json_generation_config, response_usage
+from services.gemini import response_text as gemini_response_text
+from services.comment_analysis import ANALYSIS_STAGES, AnalysisError, run_batch_analysis
+from services.jobs import JobQueue
+from services.micro_batcher import all_batcher_stats
+from services.model_registry import registry, warm_up_from_env
+from services.transcript_summary import build_reduce_prompt, condense_transcript, needs_map_reduce
+from services.youtube import extract_video_id
 
 analysis_bp = Blueprint('analysis_bp', __name__)
 
@@ -27,146 +26,62 @@ load_dotenv()
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
 YOUTUBE_API_KEY = os.environ.get("YOUTUBE_API_KEY")
 
-gemini_model = None
-if GEMINI_API_KEY and GEMINI_API_KEY != "VOTRE_CLE_API_GEMINI_ICI":
-    try:
-        genai.configure(api_key=GEMINI_API_KEY)
-        gemini_model = genai.GenerativeModel('gemini-1.5-flash')
-    except Exception as e:
-        print(f"Failed to configure Gemini: {e}")
-
-youtube_service = None
-if YOUTUBE_API_KEY and YOUTUBE_API_KEY != "VOTRE_CLE_API_YOUTUBE_ICI":
-    try:
-        youtube_service = build('youtube', 'v3', developerKey=YOUTUBE_API_KEY)
-    except Exception as e:
-        print(f"Failed to build YouTube service: {e}")
-
-def extract_video_id(url):
-    regex = r"(?:https?://)?(?:www\.)?(?:youtube\.com/(?:[^/\n\s]+/\S+/|(?:v|e(?:mbed)?)/|\S*?[?&]v=)|youtu\.be/|youtube\.com/shorts/)([a-zA-Z0-9_-]{11})"
-    match = re.search(regex, url)
-    return match.group(1) if match else None
-
-sentiment_pipeline = None
-semantic_model = None
-
-def get_word_ranking(texts, top_n=50):
-    stop_words = set(['a', 'à', 'alors', 'au', 'aucuns', 'aussi', 'autre', 'avant', 'avec', 'avoir', 'bon', 'car', 'ce', 'cela', 'ces', 'ceux', 'chaque', 'ci', 'comme', 'comment', 'dans', 'de', 'des', 'du', 'dedans', 'dehors', 'depuis', 'devrait', 'doit', 'donc', 'dos', 'début', 'elle', 'elles', 'en', 'encore', 'essai', 'est', 'et', 'eu', 'fait', 'faites', 'fois', 'font', 'hors', 'ici', 'il', 'ils', 'je', 'juste', 'la', 'le', 'les', 'leur', 'là', 'ma', 'maintenant', 'mais', 'mes', 'mien', 'moins', 'mon', 'mot', 'même', 'ni', 'nommés', 'notre', 'nous', 'nouveaux', 'ou', 'où', 'par', 'parce', 'pas', 'peut', 'peu', 'plupart', 'pour', 'pourquoi', 'quand', 'que', 'quel', 'quelle', 'quelles', 'quels', 'qui', 'sa', 'sans', 'ses', 'seulement', 'si', 'sien', 'son', 'sont', 'sous', 'soyez', 'sujet', 'sur', 'ta', 'tandis', 'tellement', 'tels', 'tes', 'ton', 'tous', 'tout', 'trop', 'très', 'tu', 'voient', 'vont', 'votre', 'vous', 'vu', 'ça', 'étaient', 'état', 'étions', 'été', 'être', 'i', 'me', 'my', 'myself', 'we', 'our', 'ours', 'ourselves', 'you', 'your', 'yours', 'yourself', 'yourselves', 'he', 'him', 'his', 'himself', 'she', 'her', 'hers', 'herself', 'it', 'its', 'itself', 'they', 'them', 'their', 'theirs', 'themselves', 'what', 'which', 'who', 'whom', 'this', 'that', 'these', 'those', 'am', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'having', 'do', 'does', 'did', 'doing', 'a', 'an', 'the', 'and', 'but', 'if', 'or', 'because', 'as', 'until', 'while', 'of', 'at', 'by', 'for', 'with', 'about', 'against', 'between', 'into', 'through', 'during', 'before', 'after', 'above', 'below', 'to', 'from', 'up', 'down', 'in', 'out', 'on', 'off', 'over', 'under', 'again', 'further', 'then', 'once', 'here', 'there', 'when', 'where', 'why', 'how', 'all', 'any', 'both', 'each', 'few', 'more', 'most', 'other', 'some', 'such', 'no', 'nor', 'not', 'only', 'own', 'same', 'so', 'than', 'too', 'very', 's', 't', 'can', 'will', 'just', 'don', 'should', 'now', 'd', 'll', 'm', 'o', 're', 've', 'y', 'ain', 'aren', 'couldn', 'didn', 'doesn', 'hadn', 'hasn', 'haven', 'isn', 'ma', 'mightn', 'mustn', 'needn', 'shan', 'shouldn', 'wasn', 'weren', 'won', 'wouldn', 'cest', 'jai', 'cest', 'sil', 'quil', 'dun', 'une', 'jai'])
-    all_words = []
-    translator = str.maketrans('', '', string.punctuation)
-    for text in texts:
-        cleaned_text = text.lower().translate(translator)
-        words = cleaned_text.split()
-        filtered_words = [word for word in words if word not in stop_words and len(word) > 2]
-        all_words.extend(filtered_words)
-    word_counts = Counter(all_words)
-    return word_counts.most_common(top_n)
-
-class PDF(FPDF):
-    def __init__(self, video_url=None, video_title=None, thumbnail_url=None):
-        super().__init__()
-        self.video_url = video_url
-        self.video_title = video_title
-        self.thumbnail_url = thumbnail_url
-        self.video_id = extract_video_id(video_url) if video_url else None
-        self.set_margins(20, 20, 20)
-        self.set_auto_page_break(auto=True, margin=20)
-        self.font_family = 'helvetica'
-        try:
-            font_dir = os.path.join(current_app.root_path, 'templates', 'public', 'fonts')
-            arial_path = os.path.join(font_dir, 'arial.ttf')
-            if os.path.exists(arial_path):
-                self.add_font('Arial', '', arial_path, uni=True)
-                self.font_family = 'Arial'
-                arialbd_path = os.path.join(font_dir, 'G_ari_bd.TTF')
-                if os.path.exists(arialbd_path): self.add_font('Arial', 'B', arialbd_path, uni=True)
-                ariali_path = os.path.join(font_dir, 'G_ari_i.TTF')
-                if os.path.exists(ariali_path): self.add_font('Arial', 'I', ariali_path, uni=True)
-        except Exception as e:
-            print(f"PDF font loading error: {e}")
-
-    def header(self):
-        self.set_font(self.font_family, 'B', 10)
-        self.set_text_color(150, 150, 150)
-        self.cell(0, 10, 'Mindmap de la Vidéo', 0, 0, 'L')
-        logo_path = os.path.join(current_app.root_path, 'templates', 'public', 'Scriptou.png')
-        if os.path.exists(logo_path): self.image(logo_path, x=self.w - 30, y=15, w=10)
-        self.ln(15)
-
-    def footer(self):
-        self.set_y(-15)
-        self.set_font(self.font_family, 'I', 8)
-        self.set_text_color(150, 150, 150)
-        self.cell(0, 10, f'Page {self.page_no()}', 0, 0, 'C')
-
-    def add_title_page(self, main_title):
-        self.add_page()
-        if self.thumbnail_url:
-            try:
-                response = requests.get(self.thumbnail_url, stream=True)
-                if response.status_code == 200:
-                    img_buffer = BytesIO(response.content)
-                    self.image(img_buffer, x='C', y=30, w=self.w / 1.5)
-            except Exception as e:
-                pass
-        
-        self.set_y(self.get_y() + 100)
-        if self.video_title:
-            self.set_font(self.font_family, 'B', 24)
-            self.set_text_color(0, 0, 0)
-            self.multi_cell(0, 12, self.video_title, 0, 'C')
-            self.ln(10)
-
-        self.set_font(self.font_family, 'I', 16)
-        self.set_text_color(80, 80, 80)
-        self.multi_cell(0, 10, main_title, 0, 'C')
-
-    def write_with_links(self, text, font_size, style='', color=(50,50,50)):
-        self.set_font(self.font_family, style, font_size)
-        self.set_text_color(*color)
-        
-        clean_text = re.sub(r'\s*\(\d{1,2}:\d{2}(?:\d{2})?\)\s*$', '', text)
-        self.write(0, clean_text)
-
-        match_time = re.search(r'\((\d{1,2}:\d{2}(?:\d{2})?)\)', text)
-        if self.video_id and match_time:
-            timestamp = match_time.group(1)
-            time_parts = list(map(int, timestamp.split(':')))
-            seconds = sum(p * 60**i for i, p in enumerate(reversed(time_parts)))
-            youtube_link = f"https://www.youtube.com/watch?v={self.video_id}&t={seconds}s"
-            
-            self.set_x(self.get_x() + 2)
-            icon_path = os.path.join(current_app.root_path, 'templates', 'public', 'youtube_icon.png')
-            if os.path.exists(icon_path):
-                icon_height_user_unit = 3.5 / self.k
-                font_size_user_unit = font_size / self.k
-                
-                y_pos = self.get_y() - (font_size_user_unit / 4) - (icon_height_user_unit / 2)
-                
-                self.image(icon_path, x=self.get_x(), y=y_pos, h=icon_height_user_unit, link=youtube_link)
-
-    def add_heading(self, text, level):
-        font_sizes = { 2: 20, 3: 16, 4: 14, 5: 12, 6: 12 }
-        colors = { 2: (0, 0, 0), 3: (50, 50, 50), 4: (100, 100, 100), 5: (140, 140, 140), 6: (170, 170, 170) }
-        color = colors.get(level, (80, 80, 80))
-        
-        if level == 2: self.add_page()
-        
-        self.ln(10 if level == 2 else 5)
-        self.write_with_links(text, font_sizes.get(level, 12), 'B', color)
-        self.ln(5)
-
-    def add_bullet_item(self, text, indent_level):
-        bullet_colors = { 1: (30, 30, 30), 2: (80, 80, 80), 3: (130, 130, 130), }
-        color = bullet_colors.get(indent_level, (160, 160, 160))
-
-        self.ln(4)
-        indent = 25 + ((indent_level -1) * 8)
-        self.set_x(indent)
-        self.set_font(self.font_family, '', 11)
-        self.set_text_color(*color)
-        self.write(0, '• ')
-        self.write_with_links(text, 11, '', color)
+def load_gemini_model():
+    if not GEMINI_API_KEY or GEMINI_API_KEY == "VOTRE_CLE_API_GEMINI_ICI":
+        return None
+    import google.generativeai as genai
+    genai.configure(api_key=GEMINI_API_KEY)
+    return genai.GenerativeModel(GEMINI_MODEL_NAME)
+
+def load_youtube_service():
+    if not YOUTUBE_API_KEY or YOUTUBE_API_KEY == "VOTRE_CLE_API_YOUTUBE_ICI":
+        return None
+    from googleapiclient.discovery import build
+    return build('youtube', 'v3', developerKey=YOUTUBE_API_KEY)
+
+# Services construits à la première utilisation (voir services/model_registry.py)
+# Clients réseau: jamais partagés entre processus (voir gunicorn.conf.py)
+registry.register('gemini', load_gemini_model, fork_safe=False)
+registry.register('youtube', load_youtube_service, fork_safe=False)
+
+# --- Cache des transcriptions ---
+# Clé: (video_id, langue). Une entrée est enregistrée pour la langue demandée et pour la langue résolue.
+TRANSCRIPT_CACHE_TTL = int(os.environ.get("TRANSCRIPT_CACHE_TTL", 7 * 24 * 3600))
+TRANSCRIPT_CACHE_MAX_ENTRIES = int(os.environ.get("TRANSCRIPT_CACHE_MAX_ENTRIES", 5000))
+transcript_cache = SQLiteCache('transcripts', ttl=TRANSCRIPT_CACHE_TTL, max_entries=TRANSCRIPT_CACHE_MAX_ENTRIES)
+
+def transcript_cache_key(video_id, language):
+    return f"{video_id}:{language}"
+
+# Titre affiché quand l'API YouTube ne répond pas: jamais considéré comme définitif dans le cache
+VIDEO_TITLE_UNAVAILABLE = "Titre non disponible"
+
+# --- Cache des réponses Gemini (/gemini, /analyze_comments) ---
+# Clé: (modèle, contenu du fichier prompt, texte d'entrée, configuration de génération). "no_cache" dans la requête
+# force un nouvel appel (la réponse obtenue remplace l'entrée en cache).
+LLM_CACHE_ENABLED = os.environ.get("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_TTL = int(os.environ.get("LLM_CACHE_TTL", 3 * 24 * 3600))
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", 2000))
+llm_cache = SQLiteCache('llm_responses', ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES)
+
+def llm_cache_key(endpoint, prompt_template, input_text, generation_config):
+    return hash_key(endpoint, GEMINI_MODEL_NAME, hash_key(prompt_template), hash_key(input_text), generation_config)
+
+def cached_llm_response(data, cache_key):
+    """Entrée en cache pour cette requête, ou None (cache désactivé, contourné par "no_cache" ou absent)."""
+    if not LLM_CACHE_ENABLED or data.get('no_cache'):
+        return None
+    return llm_cache.get(cache_key)
+
+def store_llm_response(cache_key, entry):
+    if LLM_CACHE_ENABLED:
+        llm_cache.set(cache_key, entry)
+
+# --- Stockage incrémental des commentaires ---
+comment_store = CommentStore()
+
+# --- File des analyses par lot asynchrones ---
+analysis_jobs = JobQueue(ANALYSIS_STAGES)
 
 @analysis_bp.route('/prompts', methods=['GET'])
 def list_prompts_route():
@@ -186,6 +101,24 @@ def list_prompts_route():
     except Exception as e:
         return jsonify({"error": f"Erreur serveur: {e}"}, 500)
 
+@analysis_bp.route('/ready', methods=['GET'])
+def readiness_route():
+    # Prêt quand les modèles préchargés (MODEL_PRELOAD, MODEL_WARMUP) le sont; gemini, youtube ou
+    # clustering_jit non demandés se chargent à la première requête et ne bloquent pas la sonde
+    return jsonify({
+        "ready": registry.is_ready_for_traffic(),
+        "expected": registry.expected(),
+        "models": registry.status()
+    })
+
+@analysis_bp.route('/inference_stats', methods=['GET'])
+def inference_stats_route():
+    return jsonify(all_batcher_stats())
+
+@analysis_bp.route('/cache_stats', methods=['GET'])
+def cache_stats_route():
+    return jsonify(all_cache_stats())
+
 @analysis_bp.route('/transcript', methods=['POST'])
 def get_transcript_route():
     try:
@@ -203,6 +136,29 @@ def get_transcript_route():
         if not video_id:
             return jsonify({"error": "URL YouTube invalide"}), 400
 
+        thumbnail_url = f"https://img.youtube.com/vi/{video_id}/hqdefault.jpg"
+
+        cached = transcript_cache.get(transcript_cache_key(video_id, language_preference))
+        if cached:
+            # Titre manquant lors de la mise en cache (erreur passagère de l'API YouTube): seul le titre est redemandé
+            if cached["video_title"] == VIDEO_TITLE_UNAVAILABLE:
+                video_title = get_video_title(video_id)
+                if video_title != VIDEO_TITLE_UNAVAILABLE:
+                    cached["video_title"] = video_title
+                    cache_languages = {language_preference, cached.get("detected_language")} - {None}
+                    transcript_cache.set_many({transcript_cache_key(video_id, lang): cached for lang in cache_languages})
+            response_data = {
+                "transcript": cached["transcript"],
+                "thumbnail_url": thumbnail_url,
+                "video_title": cached["video_title"]
+            }
+            if cached.get("detected_language"):
+                response_data["detected_language"] = cached["detected_language"]
+            response = jsonify(response_data)
+            response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
+            response.headers["X-Cache"] = "HIT"
+            return response
+
         transcript_list_data = []
         detected_lang_code = None
         
@@ -267,16 +223,16 @@ def get_transcript_route():
         
         full_transcript = "\n".join(texts)
 
-        video_title = "Titre non disponible"
-        if youtube_service:
-            try:
-                video_response = youtube_service.videos().list(part='snippet', id=video_id).execute()
-                if video_response['items']:
-                    video_title = video_response['items'][0]['snippet']['title']
-            except Exception as e_title:
-                pass
+        video_title = get_video_title(video_id)
 
-        thumbnail_url = f"https://img.youtube.com/vi/{video_id}/hqdefault.jpg"
+        if full_transcript.strip():
+            cache_entry = {
+                "transcript": full_transcript,
+                "video_title": video_title,
+                "detected_language": detected_lang_code
+            }
+            cache_languages = {language_preference, detected_lang_code} - {None}
+            transcript_cache.set_many({transcript_cache_key(video_id, lang): cache_entry for lang in cache_languages})
 
         response_data = {
             "transcript": full_transcript,
@@ -288,13 +244,59 @@ def get_transcript_route():
         
         response = jsonify(response_data)
         response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
+        response.headers["X-Cache"] = "MISS"
         return response
 
     except Exception as e:
         return jsonify({"error": "Erreur interne majeure du serveur lors de la récupération du transcript."}, 500)
 
+def get_video_title(video_id):
+    video_title = VIDEO_TITLE_UNAVAILABLE
+    youtube_service = registry.get('youtube')
+    if not youtube_service:
+        return video_title
+    try:
+        video_response = youtube_service.videos().list(part='snippet', id=video_id).execute()
+        if video_response['items']:
+            video_title = video_response['items'][0]['snippet']['title']
+    except Exception:
+        pass
+    return video_title
+
+def stream_comments_ndjson(video_id, full_refresh=False):
+    """Produit les commentaires au format NDJSON: d'abord les nouveaux (page par page), puis ceux déjà stockés.
+
+    Lignes émises: {"comment": {...}} pour chaque fil, puis {"done": true, ...} ou {"error": "..."}.
+    """
+    try:
+        youtube_service = registry.get('youtube')
+        sync_stats = {}
+        streamed_ids = set()
+        for page in comment_store.iter_sync_pages(youtube_service, video_id, full_refresh=full_refresh, stats=sync_stats):
+            if sync_stats["mode"] == "incremental":
+                streamed_ids.update(c['id'] for c in page)
+            yield "".join(json.dumps({"comment": c}, ensure_ascii=False) + "\n" for c in page)
+
+        total = sync_stats["new_comments"]
+        if sync_stats["mode"] == "incremental":
+            for comment in comment_store.iter_stored(video_id, exclude_ids=streamed_ids):
+                total += 1
+                yield json.dumps({"comment": comment}, ensure_ascii=False) + "\n"
+        sync_stats["total_comments"] = total
+
+        yield json.dumps({
+            "done": True,
+            "video_id": video_id,
+            "video_title": get_video_title(video_id),
+            "thumbnail_url": f"https://img.youtube.com/vi/{video_id}/hqdefault.jpg",
+            "sync": sync_stats
+        }, ensure_ascii=False) + "\n"
+    except Exception as e:
+        yield json.dumps({"error": f"Erreur lors de la récupération des commentaires: {e}"}, ensure_ascii=False) + "\n"
+
 @analysis_bp.route('/comments', methods=['POST'])
 def get_comments_route():
+    youtube_service = registry.get('youtube')
     if not youtube_service:
         return jsonify({"error": "Le service YouTube Data API n'est pas configuré ou la clé API est invalide."}, 503)
 
@@ -311,58 +313,25 @@ def get_comments_route():
         if not video_id:
             return jsonify({"error": "URL YouTube invalide"}), 400
 
-        all_comments = []
-        next_page_token = None
-
-        while True:
-            request_params = {
-                'part': 'snippet,replies',
-                'videoId': video_id,
-                'maxResults': 100
-            }
-            if next_page_token:
-                request_params['pageToken'] = next_page_token
+        full_refresh = bool(data.get('full_refresh', False))
 
-            response = youtube_service.commentThreads().list(**request_params).execute() 
-            
-            for item in response.get('items', []):
-                comment_data = {
-                    'id': item['id'],
-                    'text': item['snippet']['topLevelComment']['snippet']['textDisplay'],
-                    'author': item['snippet']['topLevelComment']['snippet']['authorDisplayName'],
-                    'publishedAt': item['snippet']['topLevelComment']['snippet']['publishedAt'],
-                    'likeCount': item['snippet']['topLevelComment']['snippet']['likeCount'],
-                    'replies': []
-                }
-                if 'replies' in item:
-                    for reply_item in item['replies']['comments']:
-                        comment_data['replies'].append({
-                            'id': reply_item['id'],
-                            'text': reply_item['snippet']['textDisplay'],
-                            'author': reply_item['snippet']['authorDisplayName'],
-                            'publishedAt': reply_item['snippet']['publishedAt'],
-                            'likeCount': reply_item['snippet']['likeCount']
-                        })
-                all_comments.append(comment_data)
-            
-            next_page_token = response.get('nextPageToken')
-            if not next_page_token:
-                break
+        # Mode streaming (opt-in): une ligne JSON par fil de commentaires, envoyée page par page
+        if data.get('stream') or 'application/x-ndjson' in request.headers.get('Accept', ''):
+            response = Response(stream_comments_ndjson(video_id, full_refresh), mimetype='application/x-ndjson')
+            response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
+            response.headers["X-Accel-Buffering"] = "no"
+            return response
 
-        video_title = "Titre non disponible"
+        all_comments, sync_stats = comment_store.sync(youtube_service, video_id, full_refresh=full_refresh)
+        video_title = get_video_title(video_id)
         thumbnail_url = f"https://img.youtube.com/vi/{video_id}/hqdefault.jpg"
-        try:
-            video_response = youtube_service.videos().list(part='snippet', id=video_id).execute()
-            if video_response['items']:
-                snippet = video_response['items'][0]['snippet']
-                video_title = snippet['title']
-        except Exception:
-            pass
 
         response_data = {
             "comments": all_comments,
+            "video_id": video_id,
             "video_title": video_title,
-            "thumbnail_url": thumbnail_url
+            "thumbnail_url": thumbnail_url,
+            "sync": sync_stats
         }
         response = jsonify(response_data)
         response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
@@ -371,8 +340,63 @@ def get_comments_route():
     except Exception as e:
         return jsonify({"error": f"Erreur interne majeure du serveur lors de la récupération des commentaires: {e}"}, 500)
 
+def uses_map_reduce(transcript_text, mode):
+    return mode == 'map_reduce' or (mode == 'auto' and needs_map_reduce(transcript_text))
+
+def build_gemini_prompt(gemini_model, prompt_template, transcript_text, mode, usages):
+    """Prompt final de /gemini et indicateur map-reduce.
+
+    Transcriptions très longues: notes horodatées par morceaux en parallèle (map), puis prompt final sur les notes (reduce).
+    """
+    if not uses_map_reduce(transcript_text, mode):
+        return prompt_template.replace("{transcript}", transcript_text), False
+    notes = condense_transcript(gemini_model, transcript_text, usages, force=mode == 'map_reduce')
+    return build_reduce_prompt(prompt_template, notes), True
+
+def sse_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+def stream_gemini_sse(gemini_model, prompt_template, transcript_text, mode, cache_key, cached=None):
+    """Produit la réponse Gemini en Server-Sent Events.
+
+    Événements émis: "status" (étape map-reduce en cours), "chunk" ({"text": ...}) au fil de la génération,
+    puis "done" ({"cost_analysis": ...}) ou "error" ({"error": ...}). Une réponse en cache (`cached`) est
+    envoyée en un seul "chunk"; une réponse complète est mise en cache sous `cache_key`.
+    """
+    if cached:
+        yield sse_event("chunk", {"text": cached["gemini_response"]})
+        yield sse_event("done", {"cost_analysis": cached_cost_analysis(cached["cost_analysis"])})
+        return
+
+    usages = []
+    try:
+        if uses_map_reduce(transcript_text, mode):
+            yield sse_event("status", {"stage": "map_reduce"})
+        final_prompt, use_map_reduce = build_gemini_prompt(gemini_model, prompt_template, transcript_text, mode, usages)
+
+        gemini_response = gemini_model.generate_content(final_prompt, stream=True)
+        texts = []
+        for chunk in gemini_response:
+            text = gemini_response_text(chunk)
+            if text:
+                texts.append(text)
+                yield sse_event("chunk", {"text": text})
+        # L'usage n'est complet qu'une fois le flux entièrement consommé
+        usages.append(response_usage(gemini_response))
+
+        cost_info = cost_analysis(usages)
+        cost_info["map_reduce"] = use_map_reduce
+        if texts:
+            store_llm_response(cache_key, {"gemini_response": "".join(texts), "cost_analysis": cost_info})
+        yield sse_event("done", {"cost_analysis": dict(cost_info, cache_hit=False)})
+    except GeminiBlockedError as e_blocked:
+        yield sse_event("error", {"error": f"Requête bloquée par Gemini: {e_blocked}"})
+    except Exception as e_gemini:
+        yield sse_event("error", {"error": f"Erreur API Gemini: {str(e_gemini)}"})
+
 @analysis_bp.route('/gemini', methods=['POST'])
 def call_gemini_route():
+    gemini_model = registry.get('gemini')
     if not gemini_model:
         return jsonify({"error": "Le modèle Gemini n'est pas configuré ou la clé API est invalide."}, 503)
 
@@ -399,20 +423,39 @@ def call_gemini_route():
         with open(prompt_file_path, 'r', encoding='utf-8') as f:
             prompt_template = f.read()
         
-        final_prompt = prompt_template.replace("{transcript}", transcript_text)
-        
+        mode = data.get('mode', 'auto')
+        # Le passage par map-reduce change la réponse: il fait partie de la configuration de génération
+        cache_key = llm_cache_key('gemini', prompt_template, transcript_text, f"map_reduce={uses_map_reduce(transcript_text, mode)}")
+        cached = cached_llm_response(data, cache_key)
+
+        # Mode streaming (opt-in): événements SSE au fil de la génération, puis le bloc de coût
+        if data.get('stream') or 'text/event-stream' in request.headers.get('Accept', ''):
+            response = Response(stream_gemini_sse(gemini_model, prompt_template, transcript_text, mode, cache_key, cached), mimetype='text/event-stream')
+            response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
+            response.headers["X-Accel-Buffering"] = "no"
+            return response
+
+        if cached:
+            response = jsonify({"gemini_response": cached["gemini_response"], "cost_analysis": cached_cost_analysis(cached["cost_analysis"])})
+            response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
+            return response
+
+        usages = []
         try:
+            final_prompt, use_map_reduce = build_gemini_prompt(gemini_model, prompt_template, transcript_text, mode, usages)
             gemini_response = gemini_model.generate_content(final_prompt)
-            response_text = "".join(part.text for part in gemini_response.parts if hasattr(part, 'text'))
-            
-            if not response_text and hasattr(gemini_response, 'prompt_feedback') and gemini_response.prompt_feedback and gemini_response.prompt_feedback.block_reason:
-                return jsonify({"error": f"Requête bloquée par Gemini: {gemini_response.prompt_feedback.block_reason}"}, 400)
-            
-            cost_info = {}
-            # Cost calculation logic can be added here if needed
-
+            response_text = gemini_response_text(gemini_response)
+            usages.append(response_usage(gemini_response))
+            cost_info = cost_analysis(usages)
+            cost_info["map_reduce"] = use_map_reduce
+            if response_text.strip():
+                store_llm_response(cache_key, {"gemini_response": response_text, "cost_analysis": cost_info})
+            cost_info = dict(cost_info, cache_hit=False)
+
+        except GeminiBlockedError as e_blocked:
+            return jsonify({"error": f"Requête bloquée par Gemini: {e_blocked}"}), 400
         except Exception as e_gemini:
-            return jsonify({"error": f"Erreur API Gemini: {str(e_gemini)}"}, 500)
+            return jsonify({"error": f"Erreur API Gemini: {str(e_gemini)}"}), 500
 
         response_data = { "gemini_response": response_text, "cost_analysis": cost_info }
         response = jsonify(response_data)
@@ -424,6 +467,7 @@ def call_gemini_route():
 
 @analysis_bp.route('/analyze_comments', methods=['POST'])
 def analyze_comments_route():
+    gemini_model = registry.get('gemini')
     if not gemini_model:
         return jsonify({"error": "Le modèle Gemini n'est pas configuré."}, 503)
 
@@ -453,137 +497,107 @@ def analyze_comments_route():
         json_schema_prompt = "{\"type\": \"object\", \"properties\": {\"sentiment\": {\"type\": \"object\", \"properties\": {\"positive\": {\"type\": \"number\"}, \"negative\": {\"type\": \"number\"}, \"neutral\": {\"type\": \"number\"}}}, \"keyThemes\": {\"type\": \"array\", \"items\": {\"type\": \"object\", \"properties\": {\"theme\": {\"type\": \"string\"}, \"summary\": {\"type\": \"string\"}, \"exampleComment\": {\"type\": \"string\"}}}}, \"videoIdeas\": {\"type\": \"array\", \"items\": {\"type\": \"string\"}}}, \"required\": [\"sentiment\", \"keyThemes\", \"videoIdeas\"} }"
         final_prompt = f"{prompt_template}\n\nVoici la liste des commentaires à analyser:\n---\n{comments_text}\n---\n\nRéponds IMPÉRATIVEMENT avec un objet JSON valide qui correspond au schéma suivant:\n{json_schema_prompt}"
         
-        generation_config = genai.types.GenerationConfig(response_mime_type="application/json")
-        gemini_response = gemini_model.generate_content(final_prompt, generation_config=generation_config)
+        cache_key = llm_cache_key('analyze_comments', prompt_template, comments_text, "response_mime_type=application/json")
+        cached = cached_llm_response(data, cache_key)
+        if cached:
+            return jsonify({"analysis_result": cached["analysis_result"], "cost_analysis": cached_cost_analysis(cached["cost_analysis"])})
+
+        gemini_response = gemini_model.generate_content(final_prompt, generation_config=json_generation_config())
         
         response_text = gemini_response.text
         analysis_json = json.loads(response_text)
-        return jsonify({"analysis_result": analysis_json})
+        cost_info = cost_analysis([response_usage(gemini_response)])
+        store_llm_response(cache_key, {"analysis_result": analysis_json, "cost_analysis": cost_info})
+        return jsonify({"analysis_result": analysis_json, "cost_analysis": dict(cost_info, cache_hit=False)})
 
     except json.JSONDecodeError:
         return jsonify({"error": "La réponse de l'IA n'était pas un JSON valide."}, 500)
     except Exception as e:
         return jsonify({"error": f"Erreur interne du serveur: {e}"}, 500)
 
+def validate_batch_request(data):
+    """Retourne (commentaires, None) si la requête est valide, sinon (None, réponse d'erreur)."""
+    if not data or 'comments' not in data or not isinstance(data['comments'], list):
+        return None, (jsonify({"error": "Requête invalide, une liste de commentaires est attendue."}), 400)
+
+    comments = data['comments']
+    if not comments:
+        return None, (jsonify({"message": "La liste de commentaires est vide, rien à analyser."}), 200)
+    if not any(c.get('text') for c in comments):
+        return None, (jsonify({"message": "Les commentaires fournis sont vides, rien à analyser."}), 200)
+    return comments, None
+
+def batch_analysis_options(data):
+    """Options facultatives de /analyze_batch: vidéo analysée (réutilisation des modèles de regroupement) et refit forcé."""
+    video_id = data.get('video_id') or (extract_video_id(data['url']) if data.get('url') else None)
+    return {"video_id": video_id, "refit": bool(data.get('refit', False))}
+
+def analysis_response(result):
+    """Réponse d'analyse au format négocié par Accept (forme habituelle, JSON colonnaire ou MessagePack), compressée si possible."""
+    body, mimetype = encode_analysis(result, negotiate_analysis_format(request.headers.get('Accept')))
+    body, compressed = maybe_gzip(body, request.headers.get('Accept-Encoding'))
+    response = Response(body, mimetype=mimetype)
+    if compressed:
+        response.headers["Content-Encoding"] = "gzip"
+    response.headers["Vary"] = "Accept, Accept-Encoding"
+    return response
+
 @analysis_bp.route('/analyze_batch', methods=['POST'])
 def analyze_batch_route():
-    global sentiment_pipeline, semantic_model
-    if sentiment_pipeline is None:
-        sentiment_pipeline = pipeline('sentiment-analysis', model='nlptown/bert-base-multilingual-uncased-sentiment')
-    if semantic_model is None:
-        semantic_model = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
-
-    if not all([sentiment_pipeline, semantic_model, gemini_model]):
-        return jsonify({"error": "Le service d'analyse n'est pas complètement initialisé."}), 503
+    # Sans Gemini, l'analyse reste utile: les thèmes sont nommés par leurs mots-clés
+    gemini_model = registry.get('gemini')
 
     try:
         data = request.get_json()
-        if not data or 'comments' not in data or not isinstance(data['comments'], list):
-            return jsonify({"error": "Requête invalide, une liste de commentaires est attendue."}, 400)
-
-        comments = data['comments']
-        if not comments:
-            return jsonify({"message": "La liste de commentaires est vide, rien à analyser."}, 200)
-            
-        texts_to_analyze = [c.get('text', '') for c in comments if c.get('text')]
-        if not texts_to_analyze:
-            return jsonify({"message": "Les commentaires fournis sont vides, rien à analyser."}, 200)
-
-        max_length = sentiment_pipeline.tokenizer.model_max_length
-        truncated_texts = [text[:max_length] for text in texts_to_analyze]
-        sentiment_results = sentiment_pipeline(truncated_texts)
-
-        embeddings = semantic_model.encode(texts_to_analyze, show_progress_bar=False)
+        comments, error_response = validate_batch_request(data)
+        if error_response:
+            return error_response
+        return analysis_response(run_batch_analysis(comments, gemini_model, **batch_analysis_options(data)))
 
-        n_neighbors = min(15, len(texts_to_analyze) - 1)
-        if n_neighbors < 2:
-             return jsonify({"error": "Pas assez de commentaires pour identifier des thèmes."}, 400)
-
-        umap_embeddings = umap.UMAP(n_neighbors=n_neighbors, n_components=20, min_dist=0.0, metric='cosine').fit_transform(embeddings)
-        min_cluster_size = max(5, int(len(texts_to_analyze) * 0.04))
+    except AnalysisError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Erreur interne du serveur lors de l'analyse par lot: {e}"}, 500)
 
-        clusterer = hdbscan.HDBSCAN(min_cluster_size=min_cluster_size, metric='euclidean', cluster_selection_method='eom').fit(umap_embeddings)
-        labels = clusterer.labels_
+@analysis_bp.route('/analyze_batch/jobs', methods=['POST'])
+def submit_analyze_batch_job_route():
+    # Sans Gemini, l'analyse reste utile: les thèmes sont nommés par leurs mots-clés
+    gemini_model = registry.get('gemini')
 
-        grouped_comments = {}
-        for i, label in enumerate(labels):
-            if label not in grouped_comments:
-                grouped_comments[label] = []
-            
-            sentiment_res = sentiment_results[i]
-            sentiment_label = sentiment_res['label']
-            if sentiment_label in ['1 star', '2 stars']: sentiment = 'négatif'
-            elif sentiment_label == '3 stars': sentiment = 'neutre'
-            else: sentiment = 'positif'
-
-            comment_data = comments[i]
-            comment_data['sentiment'] = sentiment
-            comment_data['confidence'] = sentiment_res['score']
-            grouped_comments[label].append(comment_data)
-
-        final_themes = []
-        for theme_id, theme_comments in grouped_comments.items():
-            if theme_id == -1:
-                continue
-
-            sample_comments_text = "\n".join([f"- {c['text']}" for c in theme_comments[:10]])
-            prompt = (
-                "Analyse en profondeur les commentaires suivants... Réponds en JSON: {\"theme_name\": \"...\", \"theme_summary\": \"...\"}"
-            )
-            
-            try:
-                generation_config = genai.types.GenerationConfig(response_mime_type="application/json")
-                gemini_response = gemini_model.generate_content(prompt, generation_config=generation_config)
-                response_text = gemini_response.text
-                start_index = response_text.find('{')
-                end_index = response_text.rfind('}')
-                if start_index != -1 and end_index != -1:
-                    json_str = response_text[start_index:end_index+1]
-                    theme_info = json.loads(json_str)
-                    theme_name = theme_info.get("theme_name", f"Thème {theme_id}")
-                    theme_summary = theme_info.get("theme_summary", "Pas de résumé.")
-                else:
-                    theme_name = f"Thème {theme_id}"
-                    theme_summary = "Réponse non-JSON."
-
-            except Exception as e_gemini:
-                theme_name = f"Thème {theme_id}"
-                theme_summary = f"Erreur Gemini: {str(e_gemini)}"
-
-            final_themes.append({
-                "themeId": int(theme_id),
-                "name": theme_name,
-                "summary": theme_summary,
-                "commentCount": len(theme_comments),
-                "comments": theme_comments
-            })
-
-        sentiments_list = []
-        for i, text in enumerate(texts_to_analyze):
-            sentiment_res = sentiment_results[i]
-            sentiment_label = sentiment_res['label']
-            if sentiment_label in ['1 star', '2 stars']: sentiment = 'négatif'
-            elif sentiment_label == '3 stars': sentiment = 'neutre'
-            else: sentiment = 'positif'
-            sentiments_list.append({"text": text, "sentiment": sentiment, "confidence": sentiment_res['score']})
-
-        keywords_list = [theme['name'] for theme in final_themes]
-        questions_list = [text for text in texts_to_analyze if text.strip().endswith('?')] # Corrected regex
-        word_ranking = get_word_ranking(texts_to_analyze)
+    try:
+        data = request.get_json()
+        comments, error_response = validate_batch_request(data)
+        if error_response:
+            return error_response
 
-        response_data = {
-            "analysis": {
-                "sentiments": sentiments_list,
-                "keywords": keywords_list,
-                "questions": questions_list,
-                "themes": final_themes,
-                "word_ranking": word_ranking
-            }
-        }
-        return jsonify(response_data)
+        job_id = analysis_jobs.submit(run_batch_analysis, comments, gemini_model, **batch_analysis_options(data))
+        return jsonify({
+            "job_id": job_id,
+            "status_url": f"{request.path}/{job_id}",
+            "result_url": f"{request.path}/{job_id}/result"
+        }), 202
 
     except Exception as e:
-        return jsonify({"error": f"Erreur interne du serveur lors de l'analyse par lot: {e}"}, 500)
+        return jsonify({"error": f"Erreur interne du serveur lors de la création du job d'analyse: {e}"}), 500
+
+@analysis_bp.route('/analyze_batch/jobs/<job_id>', methods=['GET'])
+def analyze_batch_job_status_route(job_id):
+    job = analysis_jobs.get(job_id)
+    if not job:
+        return jsonify({"error": "Job d'analyse inconnu ou expiré."}), 404
+    return jsonify(job)
+
+@analysis_bp.route('/analyze_batch/jobs/<job_id>/result', methods=['GET'])
+def analyze_batch_job_result_route(job_id):
+    job = analysis_jobs.get(job_id, with_result=True)
+    if not job:
+        return jsonify({"error": "Job d'analyse inconnu ou expiré."}), 404
+    if job["status"] == "failed":
+        return jsonify({"error": f"L'analyse a échoué: {job['error']}"}), 500
+    if job["status"] != "done":
+        job.pop("result", None)
+        return jsonify(job), 202
+    return analysis_response(job["result"])
 
 @analysis_bp.route('/export_pdf', methods=['POST'])
 def export_pdf_route():
@@ -601,6 +615,7 @@ def export_pdf_route():
         md = MarkdownIt()
         tokens = md.parse(markdown_content)
         
+        from services.pdf_export import PDF
         pdf = PDF(video_url=video_url, video_title=video_title, thumbnail_url=thumbnail_url)
         
         main_title = ""
@@ -634,4 +649,7 @@ def export_pdf_route():
         return send_file(pdf_buffer, as_attachment=True, download_name='mindmap_final.pdf', mimetype='application/pdf')
 
     except Exception as e:
-        return jsonify({"error": f"Erreur interne du serveur lors de la génération du PDF: {e}"}, 500)
\ No newline at end of file
+        return jsonify({"error": f"Erreur interne du serveur lors de la génération du PDF: {e}"}, 500)
+
+# Préchargement optionnel en arrière-plan (MODEL_WARMUP), sans bloquer le démarrage du worker
+warm_up_from_env()
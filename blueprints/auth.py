@@ -55,7 +55,7 @@ def login():
         return jsonify({'message': 'Identifiants invalides'}), 401
 
     token = user.get_token()
-    response = make_response(jsonify({'user': {'id': user.id, 'email': user.email, 'role': user.role}}))
+    response = make_response(jsonify({'token': token, 'user': {'id': user.id, 'email': user.email, 'role': user.role}}))
     response.set_cookie('token', token, httponly=True, samesite='Lax', secure=request.is_secure, max_age=3600)
     return response
 
@@ -1,5 +1,5 @@
 import React, { useState, useCallback, useEffect } from 'react';
-import { getComments, analyzeCommentsBatch } from '../services/geminiService';
+import { streamComments, analyzeCommentsBatchJob } from '../services/geminiService';
 import type { CommentAnalysisResult } from '../types';
 import { BarChartIcon, BotIcon } from './ui/icons';
 
@@ -11,6 +11,17 @@ const personas = [
     { id: 'journalist', name: 'Journaliste', promptPath: 'prompt/journalist.txt' },
 ];
 
+// Libellés des étapes renvoyées par le suivi des jobs d'analyse
+const stageLabels: { [stage: string]: string } = {
+    embedding: 'Vectorisation des commentaires',
+    deduplication: 'Regroupement des doublons',
+    sentiment: 'Analyse des sentiments',
+    reduction: 'Réduction de dimension',
+    clustering: 'Regroupement par thèmes',
+    keywords: 'Extraction des mots-clés',
+    naming: 'Nommage des thèmes',
+};
+
 type AnalysesState = {
     [key: string]: CommentAnalysisResult | null;
 };
@@ -20,6 +31,7 @@ const InteractiveDemo: React.FC = () => {
     const [isLoading, setIsLoading] = useState<string | null>(null); // Store persona ID
     const [analyses, setAnalyses] = useState<AnalysesState>({});
     const [error, setError] = useState<string | null>(null);
+    const [progressMessage, setProgressMessage] = useState<string | null>(null);
     const [activeTab, setActiveTab] = useState<string | null>(null);
 
     useEffect(() => {
@@ -42,13 +54,22 @@ const InteractiveDemo: React.FC = () => {
         setError(null);
 
         try {
-            const comments = await getComments(url);
+            let received = 0;
+            const comments = await streamComments(url, (page) => {
+                received += page.length;
+                setProgressMessage(`${received} commentaires récupérés...`);
+            });
             if (comments.length === 0) {
                 setError("Aucun commentaire trouvé pour cette vidéo ou impossible de les récupérer.");
                 setIsLoading(null);
                 return;
             }
-            const result = await analyzeCommentsBatch(comments);
+            const result = await analyzeCommentsBatchJob(comments, (progress) => {
+                if (!progress.stage) return;
+                const label = stageLabels[progress.stage] ?? progress.stage;
+                const count = progress.total ? ` (${progress.done ?? 0}/${progress.total})` : '';
+                setProgressMessage(`${label}${count}...`);
+            });
             const newAnalyses = { ...analyses, [personaId]: result };
             setAnalyses(newAnalyses);
             setActiveTab(personaId);
@@ -58,6 +79,7 @@ const InteractiveDemo: React.FC = () => {
             console.error(err);
         } finally {
             setIsLoading(null);
+            setProgressMessage(null);
         }
     }, [url, analyses]);
 
@@ -98,6 +120,7 @@ const InteractiveDemo: React.FC = () => {
                 </div>
 
                 {error && <p className="text-center mt-6" style={{ color: 'var(--error-color)' }}>{error}</p>}
+                {progressMessage && <p className="text-center mt-6" style={{ color: 'var(--text-medium)' }}>{progressMessage}</p>}
 
                 <div className="mt-12 max-w-5xl mx-auto">
                     <div className="text-center mb-8">
@@ -24,12 +24,56 @@ export const getComments = async (videoUrl: string): Promise<Comment[]> => {
     return data.comments;
 };
 
+// Variante streaming (NDJSON): `onComments` est appelé dès qu'une page de commentaires arrive.
+export const streamComments = async (
+    videoUrl: string,
+    onComments: (comments: Comment[]) => void,
+): Promise<Comment[]> => {
+    const response = await fetch('/api/comments', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json', 'Accept': 'application/x-ndjson' },
+        body: JSON.stringify({ url: videoUrl, stream: true }),
+    });
+
+    if (!response.ok || !response.body) {
+        const errorData = await response.json().catch(() => ({ message: 'Failed to fetch comments' }));
+        throw new Error(errorData.error || `HTTP error! status: ${response.status}`);
+    }
+
+    const allComments: Comment[] = [];
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        const lines = buffer.split('\n');
+        buffer = lines.pop() ?? '';
+        const batch: Comment[] = [];
+        for (const line of lines) {
+            if (!line.trim()) continue;
+            const message = JSON.parse(line);
+            if (message.error) throw new Error(message.error);
+            if (message.comment) batch.push(message.comment);
+        }
+        if (batch.length > 0) {
+            allComments.push(...batch);
+            onComments(batch);
+        }
+    }
 
-export const analyzeCommentsBatch = async (comments: Comment[]): Promise<CommentAnalysisResult> => {
+    return allComments;
+};
+
+// videoId (facultatif) permet au serveur de réutiliser les modèles de regroupement de la précédente analyse.
+export const analyzeCommentsBatch = async (comments: Comment[], videoId?: string): Promise<CommentAnalysisResult> => {
     const response = await fetch('/api/analyze_batch', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ comments: comments }),
+        body: JSON.stringify({ comments: comments, video_id: videoId }),
     });
 
     if (!response.ok) {
@@ -39,3 +83,33 @@ export const analyzeCommentsBatch = async (comments: Comment[]): Promise<Comment
 
     return await response.json();
 };
+
+// Variante asynchrone: soumet un job d'analyse puis interroge son état jusqu'au résultat.
+export const analyzeCommentsBatchJob = async (
+    comments: Comment[],
+    onProgress?: (progress: { stage: string | null; done: number | null; total: number | null }) => void,
+    pollIntervalMs = 2000,
+    videoId?: string,
+): Promise<CommentAnalysisResult> => {
+    const submitResponse = await fetch('/api/analyze_batch/jobs', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ comments: comments, video_id: videoId }),
+    });
+
+    const submitData = await submitResponse.json().catch(() => ({}));
+    if (submitResponse.status !== 202) {
+        throw new Error(submitData.error || `HTTP error! status: ${submitResponse.status}`);
+    }
+
+    while (true) {
+        const resultResponse = await fetch(submitData.result_url);
+        const data = await resultResponse.json();
+        if (resultResponse.status === 200) return data;
+        if (resultResponse.status !== 202) {
+            throw new Error(data.error || `HTTP error! status: ${resultResponse.status}`);
+        }
+        onProgress?.(data.progress);
+        await new Promise(resolve => setTimeout(resolve, pollIntervalMs));
+    }
+};
@@ -6,10 +6,20 @@ export interface Sentiment {
   confidence: number;
 }
 
+export interface Theme {
+  themeId: number;
+  name: string;
+  summary: string;
+  commentCount: number;
+  // Indices des commentaires du thème dans Analysis.sentiments
+  commentIndices: number[];
+}
+
 export interface Analysis {
   keywords: string[];
   questions: string[];
   sentiments: Sentiment[];
+  themes?: Theme[];
 }
 
 export interface Summary {
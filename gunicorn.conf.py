@@ -0,0 +1,77 @@
+"""Configuration gunicorn: modèles chargés une seule fois dans le processus maître puis partagés par les workers.
+
+    gunicorn -c gunicorn.conf.py
+
+Avec GUNICORN_PRELOAD_MODELS=1 (défaut), l'application est importée dans le maître (preload_app), les modèles
+listés dans MODEL_PRELOAD y sont chargés avant le fork, puis gc.freeze() sort tous les objets existants du
+ramasse-miettes: les workers lisent les poids en copie sur écriture sans dupliquer les pages mémoire.
+Ajouter des workers n'augmente donc plus la mémoire occupée par les modèles.
+
+L'application servie (GUNICORN_APP, défaut app:app) doit exposer les routes de blueprints/analysis.py:
+ce sont elles qui passent par le registre de services/model_registry.py. app.py ne charge aucun modèle
+à l'import; le maître ne contient donc qu'un exemplaire de chaque modèle, celui du registre.
+"""
+import gc
+import os
+
+from dotenv import load_dotenv
+
+# Le .env doit être lu avant les réglages ci-dessous, pour que MODEL_WARMUP y soit pris en compte
+load_dotenv()
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5001")
+workers = int(os.environ.get("GUNICORN_WORKERS", 4))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+wsgi_app = os.environ.get("GUNICORN_APP", "app:app")
+
+preload_app = os.environ.get("GUNICORN_PRELOAD_MODELS", "1") == "1"
+# Modèles chargés dans le maître. Les clients réseau (gemini, youtube) ne doivent pas y figurer:
+# leurs connexions ne survivent pas au fork et sont reconstruites dans chaque worker.
+MODEL_PRELOAD = os.environ.get("MODEL_PRELOAD", "sentiment,semantic,umap,hdbscan")
+# Threads d'inférence PyTorch par worker (évite que N workers se disputent tous les cœurs)
+WORKER_TORCH_THREADS = int(os.environ.get("WORKER_TORCH_THREADS", 1))
+
+# Préchargement en arrière-plan (MODEL_WARMUP) fait dans chaque worker après le fork, pas dans le maître:
+# les threads qu'il démarre (compilation Numba, OpenMP) ne survivraient pas au fork.
+# La variable est vidée plutôt que supprimée: load_dotenv(), appelé à l'import de l'application,
+# ne remplace pas une variable existante mais remettrait celle du .env si elle était absente.
+WORKER_MODEL_WARMUP = os.environ.get("MODEL_WARMUP", "") if preload_app else ""
+if preload_app:
+    os.environ["MODEL_WARMUP"] = ""
+
+# Les tokenizers Rust ne supportent pas un fork après usage de leur pool de threads
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    # L'application est déjà importée (preload_app): le registre contient les modèles qu'elle utilise
+    from services.model_registry import registry
+
+    names = [name.strip() for name in MODEL_PRELOAD.split(",") if name.strip()]
+    unknown = [name for name in names if name not in registry.status()]
+    if unknown:
+        server.log.warning("MODEL_PRELOAD: modèles non enregistrés par l'application servie: %s", ", ".join(unknown))
+    # Chargement seulement, sans inférence: un pool OpenMP démarré dans le maître bloquerait les workers
+    registry.warm_up(names, background=False)
+    for name, entry in registry.status().items():
+        if name in names:
+            server.log.info("Modèle %s: %s (%ss)", name, entry["status"], entry["load_seconds"])
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    if not preload_app:
+        return
+    from services.model_registry import registry, warm_up_from_env
+
+    registry.reset_after_fork()
+    try:
+        import torch
+        torch.set_num_threads(WORKER_TORCH_THREADS)
+    except ImportError:
+        pass
+    warm_up_from_env(WORKER_MODEL_WARMUP)
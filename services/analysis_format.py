@@ -0,0 +1,75 @@
+import gzip
+import json
+
+from services.comment_analysis import SENTIMENT_NAMES, is_question
+
+try:
+    import msgpack
+except ImportError:  # format MessagePack indisponible: repli sur le JSON colonnaire
+    msgpack = None
+
+COLUMNAR_JSON_MIMETYPE = "application/vnd.commentsense.columnar+json"
+MSGPACK_MIMETYPES = ("application/msgpack", "application/x-msgpack")
+# En dessous de cette taille, la compression gzip coûte plus qu'elle ne rapporte
+GZIP_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+
+
+def negotiate_analysis_format(accept_header):
+    """'msgpack', 'columnar' ou 'default' (forme habituelle) selon l'en-tête Accept."""
+    accept_header = accept_header or ""
+    if msgpack is not None and any(mimetype in accept_header for mimetype in MSGPACK_MIMETYPES):
+        return "msgpack"
+    if COLUMNAR_JSON_MIMETYPE in accept_header or any(mimetype in accept_header for mimetype in MSGPACK_MIMETYPES):
+        return "columnar"
+    return "default"
+
+
+def columnar_analysis(result):
+    """Convertit la réponse de run_batch_analysis en colonnes: un tableau par champ, une seule table de textes.
+
+    L'appartenance aux thèmes devient `cluster_ids` (-1 pour le bruit) et les questions des indices dans `texts`.
+    """
+    analysis = result["analysis"]
+    sentiments = analysis["sentiments"]
+    sentiment_codes = {name: code for code, name in enumerate(SENTIMENT_NAMES.tolist())}
+
+    cluster_ids = [-1] * len(sentiments)
+    for theme in analysis["themes"]:
+        for index in theme["commentIndices"]:
+            cluster_ids[index] = theme["themeId"]
+    texts = [s["text"] for s in sentiments]
+
+    return {
+        "format": "columnar",
+        "analysis": {
+            "comment_ids": [s["comment_id"] for s in sentiments],
+            "texts": texts,
+            "sentiment_labels": SENTIMENT_NAMES.tolist(),
+            "sentiment_codes": [sentiment_codes[s["sentiment"]] for s in sentiments],
+            "confidences": [round(s["confidence"], 4) for s in sentiments],
+            "cluster_ids": cluster_ids,
+            "themes": [{key: value for key, value in theme.items() if key != "commentIndices"} for theme in analysis["themes"]],
+            "keywords": analysis["keywords"],
+            "question_indices": [i for i, text in enumerate(texts) if is_question(text)],
+            "word_ranking": analysis["word_ranking"],
+            "performance": analysis.get("performance", {})
+        }
+    }
+
+
+def encode_analysis(result, analysis_format):
+    """Retourne (corps en octets, type MIME) pour le format négocié."""
+    if analysis_format == "msgpack":
+        return msgpack.packb(columnar_analysis(result), use_bin_type=True), MSGPACK_MIMETYPES[0]
+    if analysis_format == "columnar":
+        body = json.dumps(columnar_analysis(result), ensure_ascii=False, separators=(",", ":"))
+        return body.encode("utf-8"), COLUMNAR_JSON_MIMETYPE
+    return json.dumps(result, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), "application/json"
+
+
+def maybe_gzip(body, accept_encoding):
+    """Compresse le corps si le client accepte gzip et que la taille le justifie. Retourne (corps, compressé)."""
+    if "gzip" in (accept_encoding or "") and len(body) >= GZIP_MIN_BYTES:
+        return gzip.compress(body, compresslevel=GZIP_LEVEL), True
+    return body, False
@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# Dossier des caches persistants (partagé entre les workers gunicorn)
+CACHE_DIR = os.environ.get(
+    "CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache")
+)
+
+# SQLite limite le nombre de paramètres par requête
+_SQLITE_MAX_VARS = 500
+
+_registry = {}
+
+
+@contextmanager
+def sqlite_connection(path):
+    """Ouvre une connexion SQLite, valide la transaction et la ferme en sortie."""
+    conn = sqlite3.connect(path, timeout=10)
+    try:
+        yield conn
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def hash_key(*parts):
+    """Construit une clé de cache stable à partir de plusieurs éléments (hash SHA-256)."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x1f")
+    return digest.hexdigest()
+
+
+class SQLiteCache:
+    """Cache clé/valeur persistant (SQLite) avec expiration (TTL) et éviction LRU bornée en taille.
+
+    Les valeurs sont sérialisées en JSON. Les compteurs hits/misses sont propres au processus.
+    """
+
+    def __init__(self, name, ttl=None, max_entries=None, path=None):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = path or os.path.join(CACHE_DIR, f"{name}.sqlite3")
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with self._connect() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS entries ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                    "created_at REAL NOT NULL, last_access REAL NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries (last_access)")
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_created_at ON entries (created_at)")
+        except (sqlite3.Error, OSError) as e:
+            print(f"Cache '{name}' indisponible: {e}")
+        register_cache(name, self)
+
+    def _connect(self):
+        return sqlite_connection(self.path)
+
+    def _is_expired(self, created_at, now):
+        return self.ttl is not None and now - created_at > self.ttl
+
+    def _count(self, hits, misses):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys):
+        """Retourne un dict {clé: valeur} pour les clés présentes et non expirées."""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        if not keys:
+            return found
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                expired = []
+                for start in range(0, len(keys), _SQLITE_MAX_VARS):
+                    chunk = keys[start:start + _SQLITE_MAX_VARS]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows = conn.execute(
+                        f"SELECT key, value, created_at FROM entries WHERE key IN ({placeholders})", chunk
+                    ).fetchall()
+                    for key, value, created_at in rows:
+                        if self._is_expired(created_at, now):
+                            expired.append(key)
+                        else:
+                            found[key] = json.loads(value)
+                hit_keys = list(found)
+                for start in range(0, len(hit_keys), _SQLITE_MAX_VARS):
+                    chunk = hit_keys[start:start + _SQLITE_MAX_VARS]
+                    placeholders = ",".join("?" * len(chunk))
+                    conn.execute(f"UPDATE entries SET last_access = ? WHERE key IN ({placeholders})", [now] + chunk)
+                for start in range(0, len(expired), _SQLITE_MAX_VARS):
+                    chunk = expired[start:start + _SQLITE_MAX_VARS]
+                    placeholders = ",".join("?" * len(chunk))
+                    conn.execute(f"DELETE FROM entries WHERE key IN ({placeholders})", chunk)
+        except sqlite3.Error as e:
+            print(f"Erreur de lecture du cache '{self.name}': {e}")
+            found = {}
+        self._count(len(found), len(keys) - len(found))
+        return found
+
+    def set(self, key, value):
+        self.set_many({key: value})
+
+    def set_many(self, items):
+        if not items:
+            return
+        now = time.time()
+        rows = [(key, json.dumps(value, ensure_ascii=False), now, now) for key, value in items.items()]
+        try:
+            with self._connect() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO entries (key, value, created_at, last_access) VALUES (?, ?, ?, ?)", rows
+                )
+                self._evict(conn, now)
+        except sqlite3.Error as e:
+            print(f"Erreur d'écriture du cache '{self.name}': {e}")
+
+    def _evict(self, conn, now):
+        if self.ttl is not None:
+            conn.execute("DELETE FROM entries WHERE created_at < ?", (now - self.ttl,))
+        if self.max_entries is not None:
+            (count,) = conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+            overflow = count - self.max_entries
+            if overflow > 0:
+                conn.execute(
+                    "DELETE FROM entries WHERE key IN "
+                    "(SELECT key FROM entries ORDER BY last_access ASC LIMIT ?)", (overflow,)
+                )
+
+    def delete(self, key):
+        try:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            print(f"Erreur de suppression dans le cache '{self.name}': {e}")
+
+    def stats(self):
+        entries = None
+        try:
+            with self._connect() as conn:
+                (entries,) = conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / total, 4) if total else None
+        }
+
+
+def register_cache(name, cache):
+    """Enregistre un cache (tout objet exposant stats()) pour /api/cache_stats."""
+    _registry[name] = cache
+
+
+def all_cache_stats():
+    """Statistiques de tous les caches instanciés dans ce processus."""
+    return {name: cache.stats() for name, cache in _registry.items()}
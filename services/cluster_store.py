@@ -0,0 +1,69 @@
+import os
+import pickle
+import re
+import time
+
+from services.cache import CACHE_DIR
+
+# Réutilisation des modèles UMAP/HDBSCAN ajustés lors de la précédente analyse d'une vidéo
+CLUSTER_MODEL_REUSE = os.environ.get("CLUSTER_MODEL_REUSE", "1") == "1"
+# Durée de conservation d'un modèle sans nouvelle analyse de la vidéo (secondes)
+CLUSTER_MODEL_TTL = int(os.environ.get("CLUSTER_MODEL_TTL", 30 * 24 * 3600))
+
+
+class ClusterModelStore:
+    """Modèles de regroupement ajustés (réducteur UMAP, HDBSCAN) et étiquettes connues, un fichier pickle par vidéo.
+
+    Les fichiers sont écrits puis renommés: un worker ne lit jamais un modèle partiellement écrit.
+    Les fichiers sont produits par l'application elle-même; le dossier ne doit pas être accessible en écriture à des tiers.
+    """
+
+    def __init__(self, directory=None, ttl=CLUSTER_MODEL_TTL):
+        self.directory = directory or os.path.join(CACHE_DIR, "cluster_models")
+        self.ttl = ttl
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, video_id):
+        return os.path.join(self.directory, re.sub(r"[^A-Za-z0-9_-]", "_", video_id) + ".pkl")
+
+    def load(self, video_id):
+        path = self._path(video_id)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                return None
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Modèle de regroupement illisible pour {video_id}: {e}")
+            return None
+
+    def save(self, video_id, state):
+        path = self._path(video_id)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Erreur d'enregistrement du modèle de regroupement pour {video_id}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self._purge_expired()
+
+    def delete(self, video_id):
+        try:
+            os.remove(self._path(video_id))
+        except FileNotFoundError:
+            pass
+
+    def _purge_expired(self):
+        now = time.time()
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if now - os.path.getmtime(path) > self.ttl:
+                    os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,279 @@
+import os
+import time
+
+import numpy as np
+
+from services.cache import CACHE_DIR
+from services.model_registry import registry
+
+# En dessous de ce nombre de commentaires: HDBSCAN directement sur les embeddings normalisés (pas d'UMAP)
+CLUSTERING_SMALL_MAX = int(os.environ.get("CLUSTERING_SMALL_MAX", 300))
+# Au-delà: UMAP et HDBSCAN sont ajustés sur un échantillon stratifié, le reste est projeté puis affecté
+CLUSTERING_LARGE_MIN = int(os.environ.get("CLUSTERING_LARGE_MIN", 20000))
+CLUSTERING_SAMPLE_SIZE = int(os.environ.get("CLUSTERING_SAMPLE_SIZE", 10000))
+# Force la recherche approximative des plus proches voisins (pynndescent) dans UMAP
+CLUSTERING_APPROX_NN = os.environ.get("CLUSTERING_APPROX_NN", "0") == "1"
+
+UMAP_COMPONENTS = 20
+
+# Réutilisation des modèles d'une vidéo: nouvel ajustement au-delà de cette part de nouveaux commentaires
+CLUSTER_REFIT_NEW_RATIO = float(os.environ.get("CLUSTER_REFIT_NEW_RATIO", 0.2))
+# ... ou si la part de nouveaux commentaires classés en bruit dépasse celle de l'ajustement de cet écart
+CLUSTER_REFIT_NOISE_DRIFT = float(os.environ.get("CLUSTER_REFIT_NOISE_DRIFT", 0.25))
+CLUSTER_DRIFT_MIN_POINTS = 20
+
+# Cache disque des fonctions compilées par Numba (UMAP, pynndescent, HDBSCAN), partagé entre workers et redémarrages
+NUMBA_CACHE_DIR = os.environ.get("NUMBA_CACHE_DIR", os.path.join(CACHE_DIR, "numba"))
+# Taille du jeu synthétique utilisé pour déclencher la compilation au démarrage
+CLUSTERING_WARMUP_POINTS = 120
+
+
+def _configure_numba():
+    # Doit précéder le premier import de numba
+    os.makedirs(NUMBA_CACHE_DIR, exist_ok=True)
+    os.environ.setdefault("NUMBA_CACHE_DIR", NUMBA_CACHE_DIR)
+
+
+def _import_umap():
+    _configure_numba()
+    import umap
+    return umap
+
+
+def _import_hdbscan():
+    _configure_numba()
+    import hdbscan
+    return hdbscan
+
+
+registry.register('umap', _import_umap)
+registry.register('hdbscan', _import_hdbscan)
+
+
+def _no_progress(stage, done=None, total=None):
+    pass
+
+
+def min_cluster_size_for(n_points):
+    return max(5, int(n_points * 0.04))
+
+
+def choose_strategy(n_points):
+    if n_points <= CLUSTERING_SMALL_MAX:
+        return 'direct'
+    if n_points >= CLUSTERING_LARGE_MIN:
+        return 'sampled'
+    return 'umap'
+
+
+def normalize_rows(embeddings):
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+
+def stratified_sample(n_points, sample_size, strata=None, seed=42):
+    """Indices triés d'un échantillon de `sample_size` points, proportionnel à chaque strate (ex: sentiment)."""
+    rng = np.random.default_rng(seed)
+    if sample_size >= n_points:
+        return np.arange(n_points)
+    if strata is None:
+        return np.sort(rng.choice(n_points, size=sample_size, replace=False))
+
+    strata = np.asarray(strata)
+    selected = []
+    for value in np.unique(strata):
+        members = np.flatnonzero(strata == value)
+        count = max(1, int(round(sample_size * len(members) / n_points)))
+        selected.append(rng.choice(members, size=min(count, len(members)), replace=False))
+    return np.sort(np.concatenate(selected))
+
+
+def make_reducer(n_points):
+    umap = registry.get('umap')
+    kwargs = {"force_approximation_algorithm": True} if CLUSTERING_APPROX_NN else {}
+    return umap.UMAP(
+        n_neighbors=min(15, n_points - 1), n_components=UMAP_COMPONENTS, min_dist=0.0, metric='cosine', **kwargs
+    )
+
+
+def make_clusterer(n_points, prediction_data=False):
+    hdbscan = registry.get('hdbscan')
+    return hdbscan.HDBSCAN(
+        min_cluster_size=min_cluster_size_for(n_points), metric='euclidean',
+        cluster_selection_method='eom', prediction_data=prediction_data
+    )
+
+
+def _fit(embeddings, strata, progress, prediction_data=False):
+    """Ajuste la stratégie adaptée; retourne (labels, info, réducteur ou None, clusterer)."""
+    n_points = len(embeddings)
+    strategy = choose_strategy(n_points)
+    info = {"strategy": strategy, "points": n_points, "timings": {}}
+
+    if n_points < min_cluster_size_for(n_points):
+        # Trop peu de points (ex: commentaires presque tous en double) pour former un cluster
+        info["strategy"] = "none"
+        return np.full(n_points, -1), info, None, None
+
+    if strategy == 'direct':
+        progress('reduction')
+        start = time.perf_counter()
+        reduced = normalize_rows(embeddings)
+        info["timings"]["reduction"] = round(time.perf_counter() - start, 3)
+
+        progress('clustering')
+        start = time.perf_counter()
+        clusterer = make_clusterer(n_points, prediction_data=prediction_data).fit(reduced)
+        info["timings"]["clustering"] = round(time.perf_counter() - start, 3)
+        return clusterer.labels_, info, None, clusterer
+
+    if strategy == 'umap':
+        progress('reduction')
+        start = time.perf_counter()
+        reducer = make_reducer(n_points)
+        reduced = reducer.fit_transform(embeddings)
+        info["timings"]["reduction"] = round(time.perf_counter() - start, 3)
+
+        progress('clustering')
+        start = time.perf_counter()
+        clusterer = make_clusterer(n_points, prediction_data=prediction_data).fit(reduced)
+        info["timings"]["clustering"] = round(time.perf_counter() - start, 3)
+        return clusterer.labels_, info, reducer, clusterer
+
+    sample = stratified_sample(n_points, CLUSTERING_SAMPLE_SIZE, strata)
+    rest = np.setdiff1d(np.arange(n_points), sample, assume_unique=True)
+    info["sample_size"] = len(sample)
+
+    progress('reduction')
+    start = time.perf_counter()
+    reducer = make_reducer(len(sample))
+    reduced = np.empty((n_points, UMAP_COMPONENTS), dtype=np.float32)
+    reduced[sample] = reducer.fit_transform(embeddings[sample])
+    info["timings"]["reduction_fit"] = round(time.perf_counter() - start, 3)
+    start = time.perf_counter()
+    if len(rest):
+        reduced[rest] = reducer.transform(embeddings[rest])
+    info["timings"]["reduction_transform"] = round(time.perf_counter() - start, 3)
+
+    progress('clustering')
+    start = time.perf_counter()
+    clusterer = make_clusterer(len(sample), prediction_data=True).fit(reduced[sample])
+    labels = np.empty(n_points, dtype=int)
+    labels[sample] = clusterer.labels_
+    info["timings"]["clustering_fit"] = round(time.perf_counter() - start, 3)
+    start = time.perf_counter()
+    if len(rest):
+        labels[rest], _ = registry.get('hdbscan').approximate_predict(clusterer, reduced[rest])
+    info["timings"]["clustering_predict"] = round(time.perf_counter() - start, 3)
+    return labels, info, reducer, clusterer
+
+
+def cluster_embeddings(embeddings, strata=None, progress=None):
+    """Regroupe les embeddings avec la stratégie adaptée à leur nombre.
+
+    - 'direct' (petits ensembles): HDBSCAN sur les embeddings normalisés, sans le coût d'UMAP;
+    - 'umap' : UMAP (20 dimensions) puis HDBSCAN sur l'ensemble;
+    - 'sampled' (très grands ensembles): UMAP et HDBSCAN ajustés sur un échantillon stratifié par `strata`,
+      les autres points sont projetés (transform) puis affectés par hdbscan.approximate_predict.
+
+    Retourne (labels, info) où info contient la stratégie choisie et la durée de chaque étape.
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    labels, info, _, _ = _fit(embeddings, strata, progress or _no_progress)
+    return labels, info
+
+
+def _refit_reason(state, n_points, n_new, new_labels):
+    if state is None:
+        return "no_model"
+    if (state["added_since_fit"] + n_new) / max(1, state["fitted_points"]) > CLUSTER_REFIT_NEW_RATIO:
+        return "new_ratio"
+    if choose_strategy(n_points) != state["strategy"]:
+        return "strategy"
+    if new_labels is not None and len(new_labels) >= CLUSTER_DRIFT_MIN_POINTS:
+        # Dérive: les nouveaux commentaires tombent bien plus souvent dans le bruit que ceux de l'ajustement
+        if float(np.mean(new_labels == -1)) - state["noise_ratio"] > CLUSTER_REFIT_NOISE_DRIFT:
+            return "drift"
+    return None
+
+
+def cluster_incremental(store, video_id, keys, embeddings, strata=None, progress=None, refit=False):
+    """Comme cluster_embeddings, en réutilisant les modèles ajustés lors de la dernière analyse de `video_id`.
+
+    `keys` identifie chaque commentaire (ex: id YouTube). Les commentaires déjà vus gardent leur étiquette;
+    les nouveaux sont projetés avec le réducteur existant puis affectés par hdbscan.approximate_predict.
+    Un nouvel ajustement complet est fait si la part de nouveaux commentaires depuis le dernier ajustement
+    dépasse CLUSTER_REFIT_NEW_RATIO, si la stratégie change, si les nouveaux points dérivent vers le bruit, ou si `refit`.
+    """
+    progress = progress or _no_progress
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    state = None if refit else store.load(video_id)
+    known = state["labels"] if state else {}
+    new_indices = np.array([i for i, key in enumerate(keys) if key not in known], dtype=int)
+
+    reason = "refit_requested" if refit else _refit_reason(state, len(keys), len(new_indices), None)
+    if reason is None:
+        info = {"strategy": state["strategy"], "points": len(keys), "incremental": True,
+                "new_points": len(new_indices), "timings": {}}
+        progress('reduction')
+        start = time.perf_counter()
+        if len(new_indices):
+            new_embeddings = embeddings[new_indices]
+            reduced = normalize_rows(new_embeddings) if state["reducer"] is None else state["reducer"].transform(new_embeddings)
+        info["timings"]["reduction"] = round(time.perf_counter() - start, 3)
+
+        progress('clustering')
+        start = time.perf_counter()
+        new_labels = np.empty(0, dtype=int)
+        if len(new_indices):
+            new_labels, _ = registry.get('hdbscan').approximate_predict(state["clusterer"], reduced)
+        info["timings"]["clustering"] = round(time.perf_counter() - start, 3)
+
+        reason = _refit_reason(state, len(keys), len(new_indices), new_labels)
+        if reason is None:
+            labels = np.array([known.get(key, -1) for key in keys], dtype=int)
+            labels[new_indices] = new_labels
+            if len(new_indices):
+                state["labels"].update((keys[i], int(label)) for i, label in zip(new_indices, new_labels))
+                state["added_since_fit"] += len(new_indices)
+                store.save(video_id, state)
+            return labels, info
+
+    labels, info, reducer, clusterer = _fit(embeddings, strata, progress, prediction_data=True)
+    info.update({"incremental": False, "refit_reason": reason})
+    store.save(video_id, {
+        "strategy": info["strategy"],
+        "reducer": reducer,
+        "clusterer": clusterer,
+        "labels": {key: int(label) for key, label in zip(keys, labels)},
+        "fitted_points": len(keys),
+        "added_since_fit": 0,
+        "noise_ratio": float(np.mean(labels == -1)),
+        "fitted_at": time.time()
+    })
+    return labels, info
+
+
+def warm_up_clustering():
+    """Exécute la réduction et le regroupement sur un petit jeu synthétique pour compiler le code Numba.
+
+    Couvre fit_transform, transform et approximate_predict. Avec le cache disque, seuls le premier
+    démarrage et les mises à jour de bibliothèques paient la compilation.
+    """
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(4, 384))
+    points = (centers[rng.integers(0, 4, CLUSTERING_WARMUP_POINTS)]
+              + 0.1 * rng.normal(size=(CLUSTERING_WARMUP_POINTS, 384))).astype(np.float32)
+    half = CLUSTERING_WARMUP_POINTS // 2
+
+    reducer = make_reducer(half)
+    reduced = reducer.fit_transform(points[:half])
+    reducer.transform(points[half:])
+    clusterer = make_clusterer(half, prediction_data=True).fit(reduced)
+    registry.get('hdbscan').approximate_predict(clusterer, reduced[:5])
+    make_clusterer(half).fit(normalize_rows(points[:half]))
+    return True
+
+
+# Entrée à inclure dans MODEL_WARMUP pour sortir la compilation JIT du chemin des requêtes
+registry.register('clustering_jit', warm_up_clustering)
@@ -0,0 +1,242 @@
+import time
+
+import numpy as np
+
+from services.cluster_store import CLUSTER_MODEL_REUSE, ClusterModelStore
+from services.clustering import cluster_embeddings, cluster_incremental
+from services.dedup import DEDUP_ENABLED, collapse_near_duplicates, no_duplicates
+from services.embedding_cache import EmbeddingCache
+from services.inference_backends import load_embedding_model, load_sentiment_pipeline, model_cache_name
+from services.keywords import keyword_theme_name, theme_keywords
+from services.micro_batcher import MICRO_BATCHING, MicroBatcher
+from services.model_registry import registry
+from services.representatives import select_representatives
+from services.sentiment import classify_sentiments, run_sentiment_inference
+from services.text import normalize_text, text_hash
+from services.theme_naming import name_themes
+from services.word_ranking import WORD_RANKING_MAX_NGRAM, get_word_ranking
+
+SENTIMENT_MODEL_NAME = 'nlptown/bert-base-multilingual-uncased-sentiment'
+SEMANTIC_MODEL_NAME = 'paraphrase-multilingual-MiniLM-L12-v2'
+
+# Codes de sentiment (tableaux NumPy) et libellés renvoyés au client
+SENTIMENT_NAMES = np.array(['négatif', 'neutre', 'positif'])
+STAR_LABEL_CODES = {'1 star': 0, '2 stars': 0, '3 stars': 1}
+POSITIVE_CODE = 2
+
+# Étapes du pipeline d'analyse, dans l'ordre (utilisées pour le suivi de progression)
+ANALYSIS_STAGES = ['embedding', 'deduplication', 'sentiment', 'reduction', 'clustering', 'keywords', 'naming']
+
+# Un cache d'embeddings par backend effectivement chargé (voir get_embedding_cache)
+_embedding_caches = {}
+cluster_store = ClusterModelStore()
+
+
+class AnalysisError(ValueError):
+    """Erreur due aux données fournies (ex: pas assez de commentaires), renvoyée au client en 400."""
+
+
+registry.register('sentiment', lambda: load_sentiment_pipeline(SENTIMENT_MODEL_NAME))
+registry.register('semantic', lambda: load_embedding_model(SEMANTIC_MODEL_NAME))
+
+
+def load_models():
+    """Récupère (et charge à la première utilisation) le modèle de sentiment et le modèle sémantique."""
+    sentiment_pipeline = registry.get('sentiment')
+    semantic_model = registry.get('semantic')
+    if sentiment_pipeline is None or semantic_model is None:
+        raise RuntimeError("Les modèles d'analyse n'ont pas pu être chargés.")
+    return sentiment_pipeline, semantic_model
+
+
+def get_embedding_cache():
+    """Cache d'embeddings du backend effectivement chargé (à appeler après load_models()).
+
+    Après un repli sur PyTorch, les vecteurs ne sont pas rangés sous la clé du backend ONNX demandé.
+    """
+    cache_name = model_cache_name(SEMANTIC_MODEL_NAME)
+    if cache_name not in _embedding_caches:
+        _embedding_caches[cache_name] = EmbeddingCache(cache_name)
+    return _embedding_caches[cache_name]
+
+
+def _infer_sentiments(texts):
+    # Des requêtes concurrentes peuvent soumettre les mêmes textes: chacun n'est inféré qu'une fois
+    unique_texts = list(dict.fromkeys(texts))
+    results = dict(zip(unique_texts, run_sentiment_inference(registry.get('sentiment'), unique_texts)))
+    return [results[text] for text in texts]
+
+
+def _encode_texts(texts):
+    return registry.get('semantic').encode(texts, show_progress_bar=False)
+
+
+# Regroupement des inférences des requêtes concurrentes (voir services/micro_batcher.py)
+sentiment_batcher = MicroBatcher('sentiment', _infer_sentiments)
+embedding_batcher = MicroBatcher('embedding', _encode_texts)
+
+
+class _BatchedSemanticModel:
+    """Expose encode() au cache d'embeddings en passant par le micro-batcher."""
+
+    def encode(self, texts, **encode_kwargs):
+        return embedding_batcher.submit(texts)
+
+
+def is_question(text):
+    return text.strip().endswith('?')
+
+
+def _no_progress(stage, done=None, total=None):
+    pass
+
+
+def comment_cluster_key(comment):
+    """Identifiant stable d'un commentaire pour la réutilisation des modèles: id YouTube et contenu."""
+    return f"{comment.get('id', '')}:{text_hash(normalize_text(comment['text']))}"
+
+
+def run_batch_analysis(comments, gemini_model, progress=None, video_id=None, refit=False):
+    """Analyse complète d'une liste de commentaires: embeddings, quasi-doublons, sentiment, regroupement puis nommage des thèmes.
+
+    `progress(stage, done=None, total=None)` est appelé au début de chaque étape de ANALYSIS_STAGES
+    (et à chaque thème nommé pour l'étape 'naming'). Avec `video_id`, les modèles de regroupement de la
+    précédente analyse de la vidéo sont réutilisés (voir cluster_incremental). Sans `gemini_model` (None),
+    les thèmes sont nommés par leurs mots-clés. Retourne le dict de réponse de /api/analyze_batch.
+    """
+    progress = progress or _no_progress
+    sentiment_pipeline, semantic_model = load_models()
+
+    comments = [c for c in comments if c.get('text')]
+    texts_to_analyze = [c['text'] for c in comments]
+    if len(texts_to_analyze) < 3:
+        raise AnalysisError("Pas assez de commentaires pour identifier des thèmes.")
+
+    timings = {}
+    progress('embedding', 0, len(texts_to_analyze))
+    start = time.perf_counter()
+    encoder = _BatchedSemanticModel() if MICRO_BATCHING else semantic_model
+    embeddings = get_embedding_cache().encode(encoder, texts_to_analyze, show_progress_bar=False)
+    timings['embedding'] = round(time.perf_counter() - start, 3)
+
+    # Quasi-doublons regroupés: les étapes suivantes travaillent sur un représentant par groupe,
+    # puis les résultats sont étendus à tous les commentaires (les comptes restent pondérés)
+    progress('deduplication')
+    start = time.perf_counter()
+    if DEDUP_ENABLED:
+        representatives, group_of, weights = collapse_near_duplicates(texts_to_analyze, embeddings)
+    else:
+        representatives, group_of, weights = no_duplicates(len(texts_to_analyze))
+    representative_texts = [texts_to_analyze[i] for i in representatives]
+    timings['deduplication'] = round(time.perf_counter() - start, 3)
+    dedup_info = {
+        "comments": len(texts_to_analyze),
+        "unique": len(representatives),
+        "collapsed": len(texts_to_analyze) - len(representatives),
+        "largest_group": int(weights.max())
+    }
+
+    progress('sentiment', 0, len(representative_texts))
+    start = time.perf_counter()
+    sentiment_stats = {}
+    representative_sentiments = classify_sentiments(
+        sentiment_pipeline, representative_texts, model_cache_name(SENTIMENT_MODEL_NAME), stats=sentiment_stats,
+        infer=sentiment_batcher.submit if MICRO_BATCHING else None
+    )
+    timings['sentiment'] = round(time.perf_counter() - start, 3)
+
+    # Réduction et regroupement: stratégie choisie selon le nombre de commentaires (voir services/clustering.py)
+    strata = [res['label'] for res in representative_sentiments]
+    if video_id and CLUSTER_MODEL_REUSE:
+        representative_labels, clustering_info = cluster_incremental(
+            cluster_store, video_id, [comment_cluster_key(comments[i]) for i in representatives],
+            embeddings[representatives], strata=strata, progress=progress, refit=refit
+        )
+    else:
+        representative_labels, clustering_info = cluster_embeddings(embeddings[representatives], strata=strata, progress=progress)
+    timings.update(clustering_info.pop('timings'))
+    representative_labels = np.asarray(representative_labels)
+    labels = representative_labels[group_of]
+
+    # Post-traitement vectorisé: codes de sentiment, scores et étiquettes de cluster en tableaux NumPy
+    sentiment_codes = np.array(
+        [STAR_LABEL_CODES.get(res['label'], POSITIVE_CODE) for res in representative_sentiments], dtype=np.int8
+    )[group_of]
+    confidences = np.array([res['score'] for res in representative_sentiments], dtype=np.float64)[group_of]
+
+    # Regroupement en une passe: indices triés par étiquette puis découpés aux changements d'étiquette
+    order = np.argsort(labels, kind='stable')
+    sorted_labels = labels[order]
+    boundaries = np.flatnonzero(np.diff(sorted_labels)) + 1
+    cluster_ids = sorted_labels[np.r_[0, boundaries]]
+    cluster_members = np.split(order, boundaries)
+
+    # Thèmes triés par identifiant de cluster: ordre déterministe, le bruit (-1) est exclu
+    theme_members = [(int(theme_id), members) for theme_id, members in zip(cluster_ids, cluster_members) if theme_id != -1]
+
+    # Mots-clés locaux (c-TF-IDF): présents dans la réponse et noms de repli si Gemini échoue ou est désactivé
+    progress('keywords')
+    start = time.perf_counter()
+    keywords_by_theme = theme_keywords(representative_texts, representative_labels, weights=weights)
+    timings['keywords'] = round(time.perf_counter() - start, 3)
+
+    # Échantillon de chaque thème pour le prompt de nommage: représentants des quasi-doublons uniquement,
+    # proches du centroïde et variés (MMR), dans un budget de tokens par thème
+    start = time.perf_counter()
+    is_representative = np.zeros(len(comments), dtype=bool)
+    is_representative[representatives] = True
+    themes_to_name = []
+    for theme_id, members in theme_members:
+        candidates = members[is_representative[members]]
+        samples = select_representatives(embeddings[candidates], [texts_to_analyze[i] for i in candidates])
+        themes_to_name.append((theme_id, [{**comments[candidates[i]], 'text': text} for i, text in samples]))
+    timings['theme_sampling'] = round(time.perf_counter() - start, 3)
+
+    progress('naming', 0, len(themes_to_name))
+    start = time.perf_counter()
+    theme_names = name_themes(
+        gemini_model, themes_to_name,
+        on_named=lambda named: progress('naming', named, len(themes_to_name)),
+        fallback_names={theme_id: keyword_theme_name(keywords) for theme_id, keywords in keywords_by_theme.items()}
+    )
+    timings['naming'] = round(time.perf_counter() - start, 3)
+
+    # Les thèmes référencent les commentaires par leur indice dans `sentiments` au lieu de les recopier
+    final_themes = [
+        {
+            "themeId": theme_id,
+            "name": theme_name,
+            "summary": theme_summary,
+            "commentCount": len(members),
+            "keywords": keywords_by_theme.get(theme_id, []),
+            "commentIndices": members.tolist()
+        }
+        for (theme_id, members), (theme_name, theme_summary) in zip(theme_members, theme_names)
+    ]
+
+    sentiments_list = [
+        {"comment_id": comment.get('id'), "text": text, "sentiment": sentiment, "confidence": confidence}
+        for comment, text, sentiment, confidence in zip(
+            comments, texts_to_analyze, SENTIMENT_NAMES[sentiment_codes].tolist(), confidences.tolist()
+        )
+    ]
+
+    keywords_list = [theme['name'] for theme in final_themes]
+    questions_list = [text for text in texts_to_analyze if is_question(text)]
+    word_ranking = get_word_ranking(representative_texts, ngram_range=(1, WORD_RANKING_MAX_NGRAM), weights=weights)
+
+    return {
+        "analysis": {
+            "sentiments": sentiments_list,
+            "keywords": keywords_list,
+            "questions": questions_list,
+            "themes": final_themes,
+            "word_ranking": word_ranking,
+            "performance": {
+                "deduplication": dedup_info,
+                "sentiment": sentiment_stats,
+                "clustering": clustering_info,
+                "timings": timings
+            }
+        }
+    }
@@ -0,0 +1,193 @@
+import json
+import os
+import sqlite3
+import time
+
+from services.cache import CACHE_DIR, sqlite_connection
+
+# Au-delà de cet âge, une resynchronisation complète est faite (commentaires supprimés, réponses modifiées...)
+COMMENT_FULL_REFRESH_AGE = int(os.environ.get("COMMENT_FULL_REFRESH_AGE", 7 * 24 * 3600))
+
+
+def parse_comment_thread(item):
+    """Convertit un élément commentThreads de l'API YouTube en dict commentaire."""
+    top_snippet = item['snippet']['topLevelComment']['snippet']
+    comment_data = {
+        'id': item['id'],
+        'text': top_snippet['textDisplay'],
+        'author': top_snippet['authorDisplayName'],
+        'publishedAt': top_snippet['publishedAt'],
+        'likeCount': top_snippet['likeCount'],
+        'replies': []
+    }
+    if 'replies' in item:
+        for reply_item in item['replies']['comments']:
+            comment_data['replies'].append({
+                'id': reply_item['id'],
+                'text': reply_item['snippet']['textDisplay'],
+                'author': reply_item['snippet']['authorDisplayName'],
+                'publishedAt': reply_item['snippet']['publishedAt'],
+                'likeCount': reply_item['snippet']['likeCount']
+            })
+    return comment_data
+
+
+def fetch_comment_pages(youtube_service, video_id):
+    """Parcourt les pages commentThreads (du plus récent au plus ancien) et produit une liste de commentaires par page."""
+    next_page_token = None
+    while True:
+        request_params = {
+            'part': 'snippet,replies',
+            'videoId': video_id,
+            'maxResults': 100,
+            'order': 'time'
+        }
+        if next_page_token:
+            request_params['pageToken'] = next_page_token
+
+        response = youtube_service.commentThreads().list(**request_params).execute()
+        yield [parse_comment_thread(item) for item in response.get('items', [])]
+
+        next_page_token = response.get('nextPageToken')
+        if not next_page_token:
+            break
+
+
+class CommentStore:
+    """Stockage SQLite des commentaires par vidéo avec un point de reprise (commentaire le plus récent connu).
+
+    Une première synchronisation parcourt tout le fil. Les suivantes ne récupèrent que les pages
+    jusqu'à rencontrer un commentaire déjà connu, puis fusionnent les nouveautés.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(CACHE_DIR, "comments.sqlite3")
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with sqlite_connection(self.path) as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS comments ("
+                    "video_id TEXT NOT NULL, comment_id TEXT NOT NULL, published_at TEXT NOT NULL, "
+                    "data TEXT NOT NULL, PRIMARY KEY (video_id, comment_id))"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_comments_published ON comments (video_id, published_at)")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS sync_state ("
+                    "video_id TEXT PRIMARY KEY, newest_published_at TEXT, newest_comment_id TEXT, "
+                    "last_full_sync REAL NOT NULL, last_sync REAL NOT NULL)"
+                )
+        except (sqlite3.Error, OSError) as e:
+            print(f"Stockage des commentaires indisponible: {e}")
+
+    def get_state(self, video_id):
+        with sqlite_connection(self.path) as conn:
+            row = conn.execute(
+                "SELECT newest_published_at, newest_comment_id, last_full_sync, last_sync FROM sync_state WHERE video_id = ?",
+                (video_id,)
+            ).fetchone()
+        if not row:
+            return None
+        return {"newest_published_at": row[0], "newest_comment_id": row[1], "last_full_sync": row[2], "last_sync": row[3]}
+
+    def known_ids(self, video_id, comment_ids):
+        if not comment_ids:
+            return set()
+        placeholders = ",".join("?" * len(comment_ids))
+        with sqlite_connection(self.path) as conn:
+            rows = conn.execute(
+                f"SELECT comment_id FROM comments WHERE video_id = ? AND comment_id IN ({placeholders})",
+                [video_id] + list(comment_ids)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def load(self, video_id):
+        """Retourne les commentaires stockés, du plus récent au plus ancien."""
+        return list(self.iter_stored(video_id))
+
+    def iter_stored(self, video_id, exclude_ids=None):
+        """Parcourt les commentaires stockés sans les charger tous en mémoire."""
+        exclude_ids = exclude_ids or set()
+        with sqlite_connection(self.path) as conn:
+            cursor = conn.execute(
+                "SELECT comment_id, data FROM comments WHERE video_id = ? ORDER BY published_at DESC, comment_id", (video_id,)
+            )
+            for comment_id, data in cursor:
+                if comment_id not in exclude_ids:
+                    yield json.loads(data)
+
+    def _reset(self, video_id):
+        # Le point de reprise est supprimé d'abord: une synchro complète interrompue sera refaite entièrement
+        with sqlite_connection(self.path) as conn:
+            conn.execute("DELETE FROM sync_state WHERE video_id = ?", (video_id,))
+            conn.execute("DELETE FROM comments WHERE video_id = ?", (video_id,))
+
+    def _upsert(self, video_id, comments):
+        rows = [(video_id, c['id'], c['publishedAt'], json.dumps(c, ensure_ascii=False)) for c in comments]
+        with sqlite_connection(self.path) as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO comments (video_id, comment_id, published_at, data) VALUES (?, ?, ?, ?)", rows
+            )
+
+    def _update_state(self, video_id, full):
+        now = time.time()
+        with sqlite_connection(self.path) as conn:
+            newest = conn.execute(
+                "SELECT published_at, comment_id FROM comments WHERE video_id = ? ORDER BY published_at DESC LIMIT 1",
+                (video_id,)
+            ).fetchone()
+            previous = conn.execute("SELECT last_full_sync FROM sync_state WHERE video_id = ?", (video_id,)).fetchone()
+            last_full_sync = now if full or not previous else previous[0]
+            conn.execute(
+                "INSERT OR REPLACE INTO sync_state (video_id, newest_published_at, newest_comment_id, last_full_sync, last_sync) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (video_id, newest[0] if newest else None, newest[1] if newest else None, last_full_sync, now)
+            )
+
+    def iter_sync_pages(self, youtube_service, video_id, full_refresh=False, stats=None):
+        """Synchronise le fil d'une vidéo et produit chaque page de commentaires nouvellement récupérés.
+
+        Chaque page est écrite dès sa réception, ce qui évite de garder tout le fil en mémoire.
+        `stats` (dict optionnel) est complété avec le mode, le nombre d'appels API et de nouveaux commentaires.
+        """
+        stats = stats if stats is not None else {}
+        state = self.get_state(video_id)
+        full = (
+            full_refresh
+            or state is None
+            or time.time() - state["last_full_sync"] > COMMENT_FULL_REFRESH_AGE
+        )
+        stats.update({"mode": "full" if full else "incremental", "api_calls": 0, "new_comments": 0})
+        if full:
+            self._reset(video_id)
+
+        for page in fetch_comment_pages(youtube_service, video_id):
+            stats["api_calls"] += 1
+            if full:
+                self._upsert(video_id, page)
+                stats["new_comments"] += len(page)
+                yield page
+                continue
+
+            # Les pages sont triées par date: on s'arrête dès qu'un commentaire connu (ou plus ancien
+            # que le point de reprise) apparaît. Les commentaires connus de la page sont rafraîchis.
+            known = self.known_ids(video_id, [c['id'] for c in page])
+            newest_known = state["newest_published_at"] or ""
+            new_comments = [c for c in page if c['id'] not in known and c['publishedAt'] >= newest_known]
+            self._upsert(video_id, page)
+            stats["new_comments"] += len(new_comments)
+            if new_comments:
+                yield new_comments
+            if len(new_comments) < len(page):
+                break
+
+        self._update_state(video_id, full)
+
+    def sync(self, youtube_service, video_id, full_refresh=False):
+        """Synchronise puis retourne (tous les commentaires stockés, statistiques de synchro)."""
+        stats = {}
+        for _ in self.iter_sync_pages(youtube_service, video_id, full_refresh=full_refresh, stats=stats):
+            pass
+        comments = self.load(video_id)
+        stats["total_comments"] = len(comments)
+        return comments, stats
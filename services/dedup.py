@@ -0,0 +1,105 @@
+import os
+
+import numpy as np
+
+from services.clustering import normalize_rows
+from services.text import normalize_text
+
+# Regroupement des quasi-doublons (bots, chaînes de copier-coller) avant le regroupement sémantique
+DEDUP_ENABLED = os.environ.get("DEDUP_ENABLED", "1") == "1"
+# Similarité cosinus minimale entre deux embeddings pour les considérer comme doublons
+DEDUP_SIMILARITY = float(os.environ.get("DEDUP_SIMILARITY", 0.95))
+# LSH par hyperplans aléatoires: nombre de tables et de bits par signature
+DEDUP_LSH_TABLES = 6
+DEDUP_LSH_BITS = 16
+# Les seaux plus grands sont comparés par blocs de lignes à tout le seau (mémoire bornée à DEDUP_MAX_BLOCK x taille du seau)
+DEDUP_MAX_BLOCK = 1024
+
+
+def _find_roots(parent, indices):
+    """Racines union-find des indices donnés, avec compression des chemins."""
+    roots = parent[indices]
+    while True:
+        parents = parent[roots]
+        if (parents == roots).all():
+            break
+        roots = parents
+    parent[indices] = roots
+    return roots
+
+
+def _merge_exact_duplicates(parent, texts):
+    first_index = {}
+    for i, text in enumerate(texts):
+        key = normalize_text(text).lower()
+        j = first_index.setdefault(key, i)
+        if j != i:
+            # i n'a encore été relié à rien et j est une racine (premier texte de sa clé)
+            parent[i] = j
+
+
+def _merge_similar(parent, vectors, candidate_indices, threshold):
+    """Relie dans l'union-find les textes du seau dont la similarité cosinus atteint le seuil.
+
+    Seules les composantes distinctes sont reliées: chaque union réduit le nombre de composantes,
+    le nombre total d'unions reste donc inférieur au nombre de textes, même pour un seau de spam.
+    """
+    bucket_roots = _find_roots(parent, candidate_indices)
+    if (bucket_roots == bucket_roots[0]).all():
+        return
+    bucket_vectors = vectors[candidate_indices]
+    for start in range(0, len(candidate_indices), DEDUP_MAX_BLOCK):
+        block = candidate_indices[start:start + DEDUP_MAX_BLOCK]
+        matches = (vectors[block] @ bucket_vectors.T) >= threshold
+        for offset in range(len(block)):
+            root = bucket_roots[start + offset]
+            other_roots = np.unique(bucket_roots[matches[offset] & (bucket_roots != root)])
+            if len(other_roots):
+                parent[other_roots] = root
+                bucket_roots[np.isin(bucket_roots, other_roots)] = root
+        if (bucket_roots == bucket_roots[0]).all():
+            return
+
+
+def collapse_near_duplicates(texts, embeddings, threshold=None, seed=0):
+    """Regroupe les textes identiques (après normalisation) ou d'embeddings quasi identiques.
+
+    Les candidats sont trouvés par LSH (signatures de signes sur des hyperplans aléatoires), puis confirmés
+    par la similarité cosinus et reliés dans un union-find. Retourne (representatives, inverse, weights):
+    - representatives: indice du premier texte de chaque groupe, trié;
+    - inverse: pour chaque texte, la position de son groupe dans `representatives`;
+    - weights: nombre de textes de chaque groupe.
+    """
+    threshold = threshold or DEDUP_SIMILARITY
+    n_points = len(texts)
+    parent = np.arange(n_points)
+    _merge_exact_duplicates(parent, texts)
+
+    vectors = normalize_rows(np.asarray(embeddings, dtype=np.float32))
+    rng = np.random.default_rng(seed)
+    bit_values = 1 << np.arange(DEDUP_LSH_BITS, dtype=np.int64)
+    for _ in range(DEDUP_LSH_TABLES):
+        planes = rng.normal(size=(vectors.shape[1], DEDUP_LSH_BITS)).astype(np.float32)
+        signatures = ((vectors @ planes) > 0) @ bit_values
+        order = np.argsort(signatures, kind='stable')
+        boundaries = np.flatnonzero(np.diff(signatures[order])) + 1
+        for bucket in np.split(order, boundaries):
+            if len(bucket) > 1:
+                _merge_similar(parent, vectors, bucket, threshold)
+
+    components = _find_roots(parent, np.arange(n_points))
+    # Représentant = premier texte de chaque composante; groupes numérotés dans l'ordre des représentants
+    _, first_indices, inverse = np.unique(components, return_index=True, return_inverse=True)
+    order = np.argsort(first_indices, kind='stable')
+    representatives = first_indices[order]
+    position = np.empty_like(order)
+    position[order] = np.arange(len(order))
+    inverse = position[inverse]
+    weights = np.bincount(inverse, minlength=len(representatives))
+    return representatives, inverse, weights
+
+
+def no_duplicates(n_points):
+    """Résultat équivalent à collapse_near_duplicates quand le regroupement est désactivé."""
+    indices = np.arange(n_points)
+    return indices, indices, np.ones(n_points, dtype=np.int64)
@@ -0,0 +1,196 @@
+import os
+import re
+import sqlite3
+import threading
+
+import numpy as np
+
+from services.cache import CACHE_DIR, register_cache, sqlite_connection
+from services.text import normalize_text, text_hash
+
+try:
+    import fcntl
+except ImportError:  # Windows: verrou limité au processus
+    fcntl = None
+
+# Précision de stockage des vecteurs ('float32' ou 'float16', deux fois plus compact)
+EMBEDDING_CACHE_DTYPE = os.environ.get("EMBEDDING_CACHE_DTYPE", "float32")
+# Au-delà de ce nombre de vecteurs, le cache est vidé puis reconstruit au fil des requêtes
+EMBEDDING_CACHE_MAX_ROWS = int(os.environ.get("EMBEDDING_CACHE_MAX_ROWS", 2_000_000))
+
+
+class EmbeddingCache:
+    """Cache persistant d'embeddings, indexé par (modèle, hash du texte normalisé).
+
+    Les vecteurs sont ajoutés à la suite dans un fichier binaire lu par np.memmap; un index SQLite
+    associe chaque hash à sa ligne. Seuls les textes jamais vus sont encodés par le modèle.
+    Chaque remise à zéro du fichier incrémente un numéro de génération (table meta): une lecture faite
+    pendant une remise à zéro par un autre processus est détectée et ignorée.
+    """
+
+    def __init__(self, model_name, dtype=EMBEDDING_CACHE_DTYPE, max_rows=EMBEDDING_CACHE_MAX_ROWS, directory=None):
+        self.model_name = model_name
+        self.dtype = np.dtype(dtype)
+        self.max_rows = max_rows
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        directory = directory or os.path.join(CACHE_DIR, "embeddings")
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", model_name)
+        self.matrix_path = os.path.join(directory, f"{safe_name}.{self.dtype.name}.bin")
+        self.index_path = os.path.join(directory, f"{safe_name}.{self.dtype.name}.index.sqlite3")
+        self.lock_path = self.matrix_path + ".lock"
+        try:
+            os.makedirs(directory, exist_ok=True)
+            with sqlite_connection(self.index_path) as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("CREATE TABLE IF NOT EXISTS vectors (hash TEXT PRIMARY KEY, row INTEGER NOT NULL)")
+                conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        except (sqlite3.Error, OSError) as e:
+            print(f"Cache d'embeddings indisponible: {e}")
+        register_cache(f"embeddings:{model_name}", self)
+
+    def _file_lock(self):
+        return _FileLock(self.lock_path, self._lock)
+
+    def _get_dim(self, conn):
+        row = conn.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+        return int(row[0]) if row else None
+
+    def _get_generation(self, conn):
+        row = conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        return int(row[0]) if row else 0
+
+    def _current_generation(self):
+        with sqlite_connection(self.index_path) as conn:
+            return self._get_generation(conn)
+
+    def _lookup(self, hashes):
+        rows = {}
+        with sqlite_connection(self.index_path) as conn:
+            # Lue avant les lignes: une remise à zéro survenue ensuite changera forcément la génération
+            generation = self._get_generation(conn)
+            dim = self._get_dim(conn)
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for key, row in conn.execute(f"SELECT hash, row FROM vectors WHERE hash IN ({placeholders})", chunk):
+                    rows[key] = row
+        return rows, dim, generation
+
+    def _read(self, rows, dim):
+        n_rows = os.path.getsize(self.matrix_path) // (dim * self.dtype.itemsize)
+        matrix = np.memmap(self.matrix_path, dtype=self.dtype, mode="r", shape=(n_rows, dim))
+        return np.asarray(matrix[rows], dtype=np.float32)
+
+    def _append(self, hashes, vectors):
+        vectors = np.ascontiguousarray(vectors, dtype=self.dtype)
+        dim = vectors.shape[1]
+        with self._file_lock():
+            with sqlite_connection(self.index_path) as conn:
+                stored_dim = self._get_dim(conn)
+                row_bytes = dim * self.dtype.itemsize
+                first_row = os.path.getsize(self.matrix_path) // row_bytes if os.path.exists(self.matrix_path) else 0
+                if stored_dim not in (None, dim) or first_row + len(vectors) > self.max_rows:
+                    conn.execute("DELETE FROM vectors")
+                    conn.execute(
+                        "INSERT OR REPLACE INTO meta (key, value) VALUES ('generation', ?)",
+                        (str(self._get_generation(conn) + 1),)
+                    )
+                    # Nouvelle génération visible des lecteurs avant toute modification du fichier
+                    conn.commit()
+                    open(self.matrix_path, "wb").close()
+                    first_row = 0
+                with open(self.matrix_path, "ab") as f:
+                    f.truncate(first_row * row_bytes)  # ignore une éventuelle écriture partielle
+                    f.write(vectors.tobytes())
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('dim', ?)", (str(dim),))
+                conn.executemany(
+                    "INSERT OR IGNORE INTO vectors (hash, row) VALUES (?, ?)",
+                    [(key, first_row + i) for i, key in enumerate(hashes)]
+                )
+
+    def encode(self, model, texts, **encode_kwargs):
+        """Équivalent de model.encode(texts) n'encodant que les textes absents du cache. Retourne un np.ndarray float32."""
+        normalized = [normalize_text(text) for text in texts]
+        hashes = [text_hash(text) for text in normalized]
+        try:
+            rows, dim, generation = self._lookup(list(dict.fromkeys(hashes)))
+        except (sqlite3.Error, OSError) as e:
+            print(f"Erreur de lecture du cache d'embeddings: {e}")
+            rows, dim, generation = {}, None, None
+
+        missing = {}
+        for key, text in zip(hashes, normalized):
+            if key not in rows and key not in missing:
+                missing[key] = text
+        with self._lock:
+            self.hits += len(texts) - sum(1 for key in hashes if key in missing)
+            self.misses += sum(1 for key in hashes if key in missing)
+
+        encode_kwargs.setdefault("show_progress_bar", False)
+        new_vectors = {}
+        if missing:
+            encoded = np.asarray(model.encode(list(missing.values()), **encode_kwargs), dtype=np.float32)
+            new_vectors = dict(zip(missing.keys(), encoded))
+            try:
+                self._append(list(missing.keys()), encoded)
+            except (sqlite3.Error, OSError) as e:
+                print(f"Erreur d'écriture du cache d'embeddings: {e}")
+
+        cached_keys = [key for key in dict.fromkeys(hashes) if key in rows]
+        cached_vectors = {}
+        if cached_keys:
+            try:
+                vectors = self._read([rows[key] for key in cached_keys], dim)
+                if self._current_generation() != generation:
+                    raise ValueError("cache d'embeddings remis à zéro pendant la lecture")
+            except (IndexError, ValueError, OSError, sqlite3.Error):
+                # Cache vidé entre-temps par un autre processus: on encode directement
+                texts_by_key = dict(zip(hashes, normalized))
+                vectors = model.encode([texts_by_key[key] for key in cached_keys], **encode_kwargs)
+            cached_vectors = dict(zip(cached_keys, np.asarray(vectors, dtype=np.float32)))
+
+        return np.stack([new_vectors[key] if key in new_vectors else cached_vectors[key] for key in hashes])
+
+    def stats(self):
+        entries = None
+        try:
+            with sqlite_connection(self.index_path) as conn:
+                (entries,) = conn.execute("SELECT COUNT(*) FROM vectors").fetchone()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "entries": entries,
+            "max_entries": self.max_rows,
+            "dtype": self.dtype.name,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / total, 4) if total else None
+        }
+
+
+class _FileLock:
+    """Verrou exclusif inter-processus (fcntl) doublé d'un verrou entre threads."""
+
+    def __init__(self, path, thread_lock):
+        self.path = path
+        self.thread_lock = thread_lock
+        self.handle = None
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        if fcntl:
+            self.handle = open(self.path, "a")
+            fcntl.flock(self.handle, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self.handle:
+            fcntl.flock(self.handle, fcntl.LOCK_UN)
+            self.handle.close()
+            self.handle = None
+        self.thread_lock.release()
@@ -0,0 +1,106 @@
+import os
+import random
+import time
+
+GEMINI_MODEL_NAME = os.environ.get("GEMINI_MODEL_NAME", "gemini-2.5-flash-lite")
+
+# Tarifs en USD par token (entrée, sortie)
+GEMINI_PRICING = {
+    "gemini-1.5-flash": {
+        "input": 0.075 / 1_000_000,
+        "output": 0.30 / 1_000_000
+    },
+    "gemini-2.5-flash-lite": {
+        "input": 0.10 / 1_000_000,
+        "output": 0.40 / 1_000_000
+    },
+    "gemini-2.5-flash": {
+        "input": 0.35 / 1_000_000,
+        "output": 1.05 / 1_000_000
+    }
+}
+
+
+def estimate_tokens(text):
+    """Estimation grossière (environ 4 caractères par token), suffisante pour découper les requêtes."""
+    return len(text) // 4 + 1
+
+
+def json_generation_config():
+    import google.generativeai as genai
+    return genai.types.GenerationConfig(response_mime_type="application/json")
+
+
+def generate_with_retry(gemini_model, prompt, generation_config=None, timeout=30, retries=2, backoff=1.0):
+    """Appel Gemini avec délai maximal (secondes) et `retries` nouvelles tentatives (backoff exponentiel avec gigue).
+
+    Chaque appelant (nommage des thèmes, résumé des transcriptions...) passe ses propres réglages.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return gemini_model.generate_content(
+                prompt,
+                generation_config=generation_config,
+                request_options={"timeout": timeout}
+            )
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(backoff * (2 ** attempt) * (1 + random.random()))
+
+
+class GeminiBlockedError(Exception):
+    """Requête refusée par Gemini (prompt_feedback.block_reason)."""
+
+
+def response_text(gemini_response):
+    """Texte d'une réponse Gemini; lève GeminiBlockedError si la requête a été bloquée sans réponse."""
+    text = "".join(part.text for part in gemini_response.parts if hasattr(part, 'text'))
+    feedback = getattr(gemini_response, 'prompt_feedback', None)
+    if not text and feedback and feedback.block_reason:
+        raise GeminiBlockedError(str(feedback.block_reason))
+    return text
+
+
+def response_usage(gemini_response):
+    """(tokens d'entrée, tokens de sortie) d'une réponse, ou None si l'usage n'est pas renseigné."""
+    usage = getattr(gemini_response, 'usage_metadata', None)
+    if not usage:
+        return None
+    return usage.prompt_token_count or 0, usage.candidates_token_count or 0
+
+
+def cost_analysis(usages, model_name=GEMINI_MODEL_NAME):
+    """Bloc cost_analysis des réponses de l'API: tokens et coût cumulés sur un ou plusieurs appels."""
+    model_pricing = GEMINI_PRICING.get(model_name)
+    usages = [usage for usage in usages if usage is not None]
+    if not model_pricing or not usages:
+        return {"error": "Calcul du coût non disponible."}
+
+    input_tokens = sum(usage[0] for usage in usages)
+    output_tokens = sum(usage[1] for usage in usages)
+    input_cost = input_tokens * model_pricing["input"]
+    output_cost = output_tokens * model_pricing["output"]
+    return {
+        "model_used": model_name,
+        "calls": len(usages),
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "total_tokens": input_tokens + output_tokens,
+        "input_cost_usd": f"{input_cost:.8f}",
+        "output_cost_usd": f"{output_cost:.8f}",
+        "total_cost_usd": f"{input_cost + output_cost:.8f}"
+    }
+
+
+def cached_cost_analysis(original_cost):
+    """Bloc cost_analysis d'une réponse servie depuis le cache: aucun appel facturé, coût d'origine économisé."""
+    return {
+        "model_used": original_cost.get("model_used", GEMINI_MODEL_NAME),
+        "cache_hit": True,
+        "calls": 0,
+        "total_cost_usd": f"{0:.8f}",
+        "saved_cost_usd": original_cost.get("total_cost_usd"),
+        "saved_tokens": original_cost.get("total_tokens"),
+        "original": original_cost
+    }
@@ -0,0 +1,168 @@
+"""Backends d'inférence pour les modèles de sentiment et d'embeddings.
+
+INFERENCE_BACKEND choisit entre 'torch' (défaut), 'onnx' et 'onnx-int8' (ONNX Runtime avec quantification
+dynamique int8). Les modèles ONNX sont exportés au premier chargement dans ONNX_MODEL_DIR puis réutilisés.
+Si optimum / onnxruntime ne sont pas installés, le backend PyTorch est utilisé (et model_cache_name le reflète).
+
+Vérification de la parité avec PyTorch avant activation:
+    python -m services.inference_backends --backend onnx-int8 [--texts fichier.txt]
+"""
+import argparse
+import os
+import re
+
+import numpy as np
+
+from services.cache import CACHE_DIR
+
+INFERENCE_BACKENDS = ('torch', 'onnx', 'onnx-int8')
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "torch")
+ONNX_MODEL_DIR = os.environ.get("ONNX_MODEL_DIR", os.path.join(CACHE_DIR, "onnx"))
+# Jeu d'instructions ciblé par la quantification int8 ('avx2', 'avx512', 'avx512_vnni', 'arm64')
+ONNX_QUANTIZATION_TARGET = os.environ.get("ONNX_QUANTIZATION_TARGET", "avx2")
+
+PARITY_SAMPLE_TEXTS = [
+    "Super vidéo, merci beaucoup pour toutes ces explications !",
+    "Je n'ai rien compris, c'est beaucoup trop long et mal expliqué.",
+    "Bof, ni bien ni mal.",
+    "This is the best tutorial I have ever watched.",
+    "Terrible audio quality, I could not finish the video.",
+    "First!",
+    "Quelqu'un sait quel micro il utilise ?",
+    "Excelente video, muchas gracias.",
+    "Das Video ist okay, aber etwas zu lang.",
+    "Le montage est incroyable, bravo à toute l'équipe 👏👏",
+]
+
+
+# Backend effectivement chargé pour chaque modèle (diffère d'INFERENCE_BACKEND après un repli sur PyTorch)
+_loaded_backends = {}
+
+
+def model_cache_name(model_name, backend=None):
+    """Nom à utiliser dans les clés de cache: les sorties varient légèrement d'un backend à l'autre.
+
+    Par défaut, le backend du modèle chargé (INFERENCE_BACKEND si le modèle n'est pas encore chargé).
+    """
+    backend = backend or _loaded_backends.get(model_name, INFERENCE_BACKEND)
+    return model_name if backend == 'torch' else f"{model_name}@{backend}"
+
+
+def _export_dir(model_name, kind, backend):
+    return os.path.join(ONNX_MODEL_DIR, f"{re.sub(r'[^A-Za-z0-9_.-]', '_', model_name)}.{kind}.{backend}")
+
+
+def _load_onnx_sentiment_pipeline(model_name, backend):
+    from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from optimum.pipelines import pipeline as ort_pipeline
+    from transformers import AutoTokenizer
+
+    fp32_dir = _export_dir(model_name, 'sentiment', 'onnx')
+    if not os.path.isdir(fp32_dir):
+        ORTModelForSequenceClassification.from_pretrained(model_name, export=True).save_pretrained(fp32_dir)
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(fp32_dir)
+
+    model_dir, file_name = fp32_dir, None
+    if backend == 'onnx-int8':
+        model_dir = _export_dir(model_name, 'sentiment', 'onnx-int8')
+        if not os.path.isdir(model_dir):
+            quantizer = ORTQuantizer.from_pretrained(fp32_dir)
+            qconfig = getattr(AutoQuantizationConfig, ONNX_QUANTIZATION_TARGET)(is_static=False, per_channel=False)
+            quantizer.quantize(save_dir=model_dir, quantization_config=qconfig)
+            AutoTokenizer.from_pretrained(fp32_dir).save_pretrained(model_dir)
+        file_name = "model_quantized.onnx"
+
+    model = ORTModelForSequenceClassification.from_pretrained(model_dir, file_name=file_name) if file_name \
+        else ORTModelForSequenceClassification.from_pretrained(model_dir)
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    return ort_pipeline('sentiment-analysis', model=model, tokenizer=tokenizer, accelerator="ort")
+
+
+def _load_onnx_embedding_model(model_name, backend):
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    fp32_dir = _export_dir(model_name, 'embedding', 'onnx')
+    if not os.path.isdir(fp32_dir):
+        SentenceTransformer(model_name, backend="onnx").save(fp32_dir)
+
+    if backend == 'onnx-int8':
+        file_name = f"onnx/model_qint8_{ONNX_QUANTIZATION_TARGET}.onnx"
+        if not os.path.exists(os.path.join(fp32_dir, file_name)):
+            export_dynamic_quantized_onnx_model(
+                SentenceTransformer(fp32_dir, backend="onnx"), ONNX_QUANTIZATION_TARGET, fp32_dir
+            )
+        return SentenceTransformer(fp32_dir, backend="onnx", model_kwargs={"file_name": file_name})
+    return SentenceTransformer(fp32_dir, backend="onnx")
+
+
+def load_sentiment_pipeline(model_name, backend=None):
+    backend = backend or INFERENCE_BACKEND
+    if backend in ('onnx', 'onnx-int8'):
+        try:
+            model = _load_onnx_sentiment_pipeline(model_name, backend)
+            _loaded_backends[model_name] = backend
+            return model
+        except Exception as e:
+            print(f"Backend {backend} indisponible pour le sentiment, repli sur PyTorch: {e}")
+    from transformers import pipeline
+    model = pipeline('sentiment-analysis', model=model_name)
+    _loaded_backends[model_name] = 'torch'
+    return model
+
+
+def load_embedding_model(model_name, backend=None):
+    backend = backend or INFERENCE_BACKEND
+    if backend in ('onnx', 'onnx-int8'):
+        try:
+            model = _load_onnx_embedding_model(model_name, backend)
+            _loaded_backends[model_name] = backend
+            return model
+        except Exception as e:
+            print(f"Backend {backend} indisponible pour les embeddings, repli sur PyTorch: {e}")
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(model_name)
+    _loaded_backends[model_name] = 'torch'
+    return model
+
+
+def check_parity(sentiment_model_name, embedding_model_name, backend, texts=None):
+    """Compare les sorties d'un backend à celles de PyTorch sur un échantillon de textes.
+
+    Le backend est chargé sans repli: une erreur (optimum / onnxruntime absents...) est levée telle quelle.
+    """
+    texts = texts or PARITY_SAMPLE_TEXTS
+
+    reference = load_sentiment_pipeline(sentiment_model_name, 'torch')(texts, truncation=True)
+    candidate = _load_onnx_sentiment_pipeline(sentiment_model_name, backend)(texts, truncation=True)
+    label_agreement = np.mean([r['label'] == c['label'] for r, c in zip(reference, candidate)])
+    score_diff = np.abs([r['score'] - c['score'] for r, c in zip(reference, candidate)])
+
+    reference_emb = load_embedding_model(embedding_model_name, 'torch').encode(texts, normalize_embeddings=True)
+    candidate_emb = _load_onnx_embedding_model(embedding_model_name, backend).encode(texts, normalize_embeddings=True)
+    cosine = np.sum(reference_emb * candidate_emb, axis=1)
+
+    return {
+        "backend": backend,
+        "texts": len(texts),
+        "sentiment_label_agreement": float(label_agreement),
+        "sentiment_score_max_abs_diff": float(score_diff.max()),
+        "embedding_cosine_mean": float(cosine.mean()),
+        "embedding_cosine_min": float(cosine.min()),
+    }
+
+
+if __name__ == '__main__':
+    from services.comment_analysis import SENTIMENT_MODEL_NAME, SEMANTIC_MODEL_NAME
+
+    parser = argparse.ArgumentParser(description="Vérifie la parité d'un backend d'inférence avec PyTorch.")
+    parser.add_argument("--backend", choices=INFERENCE_BACKENDS[1:], default="onnx-int8")
+    parser.add_argument("--texts", help="Fichier texte, un commentaire par ligne")
+    args = parser.parse_args()
+
+    sample = None
+    if args.texts:
+        with open(args.texts, 'r', encoding='utf-8') as f:
+            sample = [line.strip() for line in f if line.strip()]
+    for name, value in check_parity(SENTIMENT_MODEL_NAME, SEMANTIC_MODEL_NAME, args.backend, sample).items():
+        print(f"{name}: {value}")
@@ -0,0 +1,106 @@
+import json
+import os
+import sqlite3
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from services.cache import CACHE_DIR, sqlite_connection
+
+ANALYSIS_JOB_WORKERS = int(os.environ.get("ANALYSIS_JOB_WORKERS", 1))
+# Durée de conservation des jobs terminés
+ANALYSIS_JOB_TTL = int(os.environ.get("ANALYSIS_JOB_TTL", 24 * 3600))
+# Un job 'running' sans mise à jour depuis ce délai est considéré comme interrompu (worker redémarré...).
+# Les jobs 'queued' n'expirent pas: ils attendent simplement un thread libre du pool.
+ANALYSIS_JOB_STALE_AFTER = int(os.environ.get("ANALYSIS_JOB_STALE_AFTER", 30 * 60))
+
+
+class JobQueue:
+    """File de jobs exécutés dans un pool de threads local, avec état persisté dans SQLite.
+
+    L'état est partagé via SQLite: n'importe quel worker gunicorn peut répondre au suivi d'un job,
+    même s'il est exécuté par un autre processus.
+    """
+
+    def __init__(self, stages, max_workers=ANALYSIS_JOB_WORKERS, path=None):
+        self.stages = list(stages)
+        self.path = path or os.path.join(CACHE_DIR, "jobs.sqlite3")
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analysis-job")
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with sqlite_connection(self.path) as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS jobs ("
+                    "id TEXT PRIMARY KEY, status TEXT NOT NULL, progress TEXT NOT NULL, "
+                    "result TEXT, error TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+                )
+        except (sqlite3.Error, OSError) as e:
+            print(f"File de jobs indisponible: {e}")
+
+    def _initial_progress(self):
+        return {"stage": None, "stages": {stage: "pending" for stage in self.stages}, "done": None, "total": None}
+
+    def _update(self, job_id, **fields):
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with sqlite_connection(self.path) as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", list(fields.values()) + [job_id])
+
+    def submit(self, fn, *args, **kwargs):
+        """Enregistre un job et le lance en arrière-plan. `fn` reçoit un argument nommé `progress`."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with sqlite_connection(self.path) as conn:
+            conn.execute("DELETE FROM jobs WHERE updated_at < ?", (now - ANALYSIS_JOB_TTL,))
+            conn.execute(
+                "INSERT INTO jobs (id, status, progress, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, "queued", json.dumps(self._initial_progress()), now, now)
+            )
+        self._executor.submit(self._run, job_id, fn, args, kwargs)
+        return job_id
+
+    def _run(self, job_id, fn, args, kwargs):
+        state = self._initial_progress()
+
+        def progress(stage, done=None, total=None):
+            if state["stage"] != stage:
+                if state["stage"] is not None:
+                    state["stages"][state["stage"]] = "done"
+                state["stage"] = stage
+            state["stages"][stage] = "running"
+            state["done"], state["total"] = done, total
+            self._update(job_id, progress=json.dumps(state))
+
+        try:
+            self._update(job_id, status="running")
+            result = fn(*args, progress=progress, **kwargs)
+            if state["stage"] is not None:
+                state["stages"][state["stage"]] = "done"
+            self._update(job_id, status="done", progress=json.dumps(state), result=json.dumps(result, ensure_ascii=False))
+        except Exception as e:
+            traceback.print_exc()
+            self._update(job_id, status="failed", error=str(e))
+
+    def get(self, job_id, with_result=False):
+        """Retourne l'état du job (ou None s'il est inconnu)."""
+        columns = "status, progress, error, created_at, updated_at" + (", result" if with_result else "")
+        with sqlite_connection(self.path) as conn:
+            row = conn.execute(f"SELECT {columns} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if not row:
+            return None
+        status, progress, error, created_at, updated_at = row[:5]
+        if status == "running" and time.time() - updated_at > ANALYSIS_JOB_STALE_AFTER:
+            status, error = "failed", "Le job a été interrompu."
+        job = {
+            "job_id": job_id,
+            "status": status,
+            "progress": json.loads(progress),
+            "error": error,
+            "created_at": created_at,
+            "updated_at": updated_at
+        }
+        if with_result:
+            job["result"] = json.loads(row[5]) if row[5] else None
+        return job
@@ -0,0 +1,93 @@
+import os
+
+import numpy as np
+
+from services.word_ranking import iter_terms, tokenize
+
+# Nombre de mots-clés retournés par thème, et n-grammes considérés
+THEME_KEYWORDS_TOP_N = int(os.environ.get("THEME_KEYWORDS_TOP_N", 8))
+THEME_KEYWORDS_MAX_NGRAM = int(os.environ.get("THEME_KEYWORDS_MAX_NGRAM", 2))
+# Un terme doit apparaître au moins ce nombre de fois (tous thèmes confondus) pour être retenu
+THEME_KEYWORDS_MIN_COUNT = 2
+
+
+def class_term_matrix(texts, labels, classes, ngram_range, weights=None):
+    """Matrice creuse (classes x termes) des occurrences, et vocabulaire (liste des termes par colonne).
+
+    `weights` (facultatif): multiplicité de chaque texte, appliquée à chacune de ses occurrences.
+    """
+    from scipy.sparse import csr_matrix
+
+    class_index = {label: i for i, label in enumerate(classes)}
+    vocabulary = {}
+    rows, cols, data = [], [], []
+    weights = np.ones(len(texts)) if weights is None else weights
+    for text, label, weight in zip(texts, labels, weights):
+        row = class_index[label]
+        for term in iter_terms(tokenize(text), ngram_range):
+            rows.append(row)
+            cols.append(vocabulary.setdefault(term, len(vocabulary)))
+            data.append(weight)
+    data = np.asarray(data, dtype=np.float64)
+    # Les doublons (classe, terme) sont additionnés à la construction
+    matrix = csr_matrix((data, (rows, cols)), shape=(len(classes), len(vocabulary)))
+    return matrix, list(vocabulary)
+
+
+def theme_keywords(texts, labels, top_n=None, ngram_range=None, weights=None):
+    """Mots-clés de chaque cluster par c-TF-IDF (TF-IDF où chaque cluster est un seul document).
+
+    poids(t, c) = tf(t, c) * log(1 + A / f(t)), avec tf normalisé par cluster, A le nombre moyen de termes
+    par cluster et f(t) la fréquence totale du terme. Le bruit (-1) compte dans f(t) mais n'a pas de mots-clés.
+    `weights` pondère chaque texte (ex: nombre de quasi-doublons qu'il représente). Retourne {cluster_id: [termes]}.
+    """
+    from scipy.sparse import diags
+
+    top_n = top_n or THEME_KEYWORDS_TOP_N
+    ngram_range = ngram_range or (1, THEME_KEYWORDS_MAX_NGRAM)
+    labels = np.asarray(labels)
+    classes = np.unique(labels).tolist()
+    counts, vocabulary = class_term_matrix(texts, labels, classes, ngram_range, weights)
+    if not vocabulary:
+        return {int(label): [] for label in classes if label != -1}
+
+    term_frequency = np.asarray(counts.sum(axis=0)).ravel()
+    class_sizes = np.asarray(counts.sum(axis=1)).ravel()
+    idf = np.log(1 + class_sizes.mean() / term_frequency)
+    idf[term_frequency < THEME_KEYWORDS_MIN_COUNT] = 0
+    tf = diags(1 / np.maximum(class_sizes, 1)) @ counts
+    weights = (tf @ diags(idf)).tocsr()
+
+    keywords = {}
+    for row, label in enumerate(classes):
+        if label == -1:
+            continue
+        start, end = weights.indptr[row], weights.indptr[row + 1]
+        row_weights, row_terms = weights.data[start:end], weights.indices[start:end]
+        if len(row_weights) > top_n:
+            best = np.argpartition(-row_weights, top_n)[:top_n]
+        else:
+            best = np.arange(len(row_weights))
+        best = best[np.argsort(-row_weights[best], kind='stable')]
+        keywords[int(label)] = [vocabulary[row_terms[i]] for i in best if row_weights[i] > 0]
+    return keywords
+
+
+def keyword_theme_name(keywords, count=3):
+    """Nom de thème de repli construit à partir des mots-clés (None si aucun).
+
+    Un mot-clé partageant un mot avec un mot-clé déjà retenu est ignoré ("micro" puis "micro mauvais").
+    """
+    chosen, used_words = [], set()
+    for keyword in keywords:
+        words = set(keyword.split())
+        if words & used_words:
+            continue
+        chosen.append(keyword)
+        used_words |= words
+        if len(chosen) == count:
+            break
+    if not chosen:
+        return None
+    chosen[0] = chosen[0].capitalize()
+    return ", ".join(chosen)
@@ -0,0 +1,129 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+# Active le regroupement des inférences entre requêtes concurrentes
+MICRO_BATCHING = os.environ.get("MICRO_BATCHING", "1") == "1"
+# Attente maximale (ms) pour compléter un lot, et nombre d'éléments à partir duquel le lot part sans attendre
+MICRO_BATCH_MAX_WAIT_MS = float(os.environ.get("MICRO_BATCH_MAX_WAIT_MS", 5))
+MICRO_BATCH_MAX_ITEMS = int(os.environ.get("MICRO_BATCH_MAX_ITEMS", 256))
+
+_batchers = {}
+
+
+class MicroBatcher:
+    """Regroupe les éléments soumis par plusieurs threads en un seul appel à `process`.
+
+    `process(items)` reçoit la concaténation des éléments des requêtes en attente et doit retourner un
+    résultat par élément, dans le même ordre. Chaque appelant récupère sa part via un Future.
+    Un seul thread exécute `process`: les inférences ne se disputent pas les cœurs CPU.
+    """
+
+    def __init__(self, name, process, max_wait_ms=MICRO_BATCH_MAX_WAIT_MS, max_items=MICRO_BATCH_MAX_ITEMS):
+        self.name = name
+        self.process = process
+        self.max_wait = max_wait_ms / 1000
+        self.max_items = max_items
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._metrics = {"requests": 0, "items": 0, "batches": 0, "max_batch_items": 0, "errors": 0,
+                         "wait_seconds": 0.0, "process_seconds": 0.0, "pending_items": 0}
+        _batchers[name] = self
+
+    def _ensure_worker(self):
+        # Le thread n'existe pas dans un worker forké: on le (re)démarre dans chaque processus
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name=f"micro-batcher-{self.name}", daemon=True)
+                self._thread.start()
+
+    def submit(self, items):
+        """Soumet des éléments et attend leurs résultats (liste alignée sur `items`)."""
+        items = list(items)
+        if not items:
+            return []
+        self._ensure_worker()
+        future = Future()
+        with self._lock:
+            self._metrics["pending_items"] += len(items)
+        self._queue.put((items, future, time.perf_counter()))
+        return future.result()
+
+    def _collect(self):
+        pending = [self._queue.get()]
+        count = len(pending[0][0])
+        deadline = time.perf_counter() + self.max_wait
+        while count < self.max_items:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            pending.append(request)
+            count += len(request[0])
+        return pending
+
+    def _run(self):
+        while True:
+            pending = self._collect()
+            items = [item for request_items, _, _ in pending for item in request_items]
+            started = time.perf_counter()
+            try:
+                results = self.process(items)
+                error = None
+            except Exception as e:
+                results, error = None, e
+
+            with self._lock:
+                metrics = self._metrics
+                metrics["batches"] += 1
+                metrics["requests"] += len(pending)
+                metrics["items"] += len(items)
+                metrics["pending_items"] -= len(items)
+                metrics["max_batch_items"] = max(metrics["max_batch_items"], len(items))
+                metrics["wait_seconds"] += sum(started - submitted for _, _, submitted in pending)
+                metrics["process_seconds"] += time.perf_counter() - started
+                if error is not None:
+                    metrics["errors"] += 1
+
+            offset = 0
+            for request_items, future, _ in pending:
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(results[offset:offset + len(request_items)])
+                offset += len(request_items)
+
+    def stats(self):
+        with self._lock:
+            metrics = dict(self._metrics)
+        batches, requests = metrics["batches"], metrics["requests"]
+        return {
+            "queue_depth": self._queue.qsize(),
+            "pending_items": metrics["pending_items"],
+            "requests": requests,
+            "batches": batches,
+            "items": metrics["items"],
+            "errors": metrics["errors"],
+            "avg_batch_items": round(metrics["items"] / batches, 1) if batches else None,
+            "max_batch_items": metrics["max_batch_items"],
+            "avg_requests_per_batch": round(requests / batches, 2) if batches else None,
+            "avg_wait_ms": round(1000 * metrics["wait_seconds"] / requests, 2) if requests else None,
+            "avg_process_ms": round(1000 * metrics["process_seconds"] / batches, 1) if batches else None,
+            "max_wait_ms": self.max_wait * 1000,
+            "max_items": self.max_items
+        }
+
+
+def all_batcher_stats():
+    return {name: batcher.stats() for name, batcher in _batchers.items()}
@@ -0,0 +1,117 @@
+import os
+import threading
+import time
+
+# Modèles à précharger en arrière-plan au démarrage du worker ('all' ou liste séparée par des virgules)
+MODEL_WARMUP = os.environ.get("MODEL_WARMUP", "")
+
+
+class ModelRegistry:
+    """Registre de modèles et services lourds, construits à la première utilisation.
+
+    Chaque entrée est un chargeur sans argument. Les imports lourds (transformers, umap...) se font
+    dans les chargeurs, pas à l'import des modules. Un chargement en échec est retenté à l'appel suivant.
+    Les entrées `fork_safe=False` (clients réseau) sont reconstruites dans chaque worker après un fork.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        # Entrées dont le préchargement a été demandé (MODEL_PRELOAD, MODEL_WARMUP): ce sont elles qui
+        # conditionnent la disponibilité du worker, les autres se chargent à la première utilisation
+        self._expected = set()
+
+    def register(self, name, loader, fork_safe=True):
+        with self._lock:
+            self._entries[name] = {
+                "loader": loader,
+                "fork_safe": fork_safe,
+                "value": None,
+                "status": "not_loaded",
+                "error": None,
+                "load_seconds": None,
+                "lock": threading.Lock()
+            }
+
+    def get(self, name):
+        """Retourne l'objet chargé (None si le chargement a échoué ou si le chargeur renvoie None)."""
+        entry = self._entries[name]
+        if entry["status"] == "ready":
+            return entry["value"]
+        with entry["lock"]:
+            if entry["status"] != "ready":
+                entry["status"] = "loading"
+                start = time.perf_counter()
+                try:
+                    entry["value"] = entry["loader"]()
+                    entry["status"], entry["error"] = "ready", None
+                except Exception as e:
+                    print(f"Échec du chargement de '{name}': {e}")
+                    entry["value"] = None
+                    entry["status"], entry["error"] = "failed", str(e)
+                entry["load_seconds"] = round(time.perf_counter() - start, 3)
+        return entry["value"]
+
+    def is_ready(self, name):
+        return self._entries[name]["status"] == "ready"
+
+    def status(self):
+        return {
+            name: {
+                "status": entry["status"],
+                "available": entry["status"] == "ready" and entry["value"] is not None,
+                "error": entry["error"],
+                "load_seconds": entry["load_seconds"]
+            }
+            for name, entry in self._entries.items()
+        }
+
+    def is_ready_for_traffic(self):
+        """Vrai quand toutes les entrées dont le préchargement a été demandé sont chargées."""
+        return all(self._entries[name]["status"] == "ready" for name in self._expected if name in self._entries)
+
+    def expected(self):
+        return sorted(name for name in self._expected if name in self._entries)
+
+    def warm_up(self, names=None, background=True):
+        """Charge les entrées demandées (toutes par défaut), dans un thread d'arrière-plan si `background`."""
+        names = list(names) if names else list(self._entries)
+        self._expected.update(names)
+
+        def load_all():
+            for name in names:
+                if name in self._entries:
+                    self.get(name)
+
+        if not background:
+            load_all()
+            return None
+        thread = threading.Thread(target=load_all, name="model-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def reset_after_fork(self):
+        """À appeler dans le processus enfant après un fork (ex: post_fork de gunicorn).
+
+        Les modèles déjà chargés par le processus parent sont conservés (mémoire partagée en copie sur écriture);
+        les verrous sont recréés, et les chargements interrompus par le fork ainsi que les entrées non
+        `fork_safe` sont remis à l'état 'not_loaded'.
+        """
+        self._lock = threading.Lock()
+        for entry in self._entries.values():
+            entry["lock"] = threading.Lock()
+            if entry["status"] == "loading" or (entry["status"] == "ready" and not entry["fork_safe"]):
+                entry["value"] = None
+                entry["status"], entry["error"], entry["load_seconds"] = "not_loaded", None, None
+
+
+registry = ModelRegistry()
+
+
+def warm_up_from_env(spec=None):
+    """Lance le préchargement configuré par MODEL_WARMUP, ou par `spec` (même format). Rien si vide."""
+    spec = MODEL_WARMUP if spec is None else spec
+    if not spec:
+        return None
+    names = None if spec == "all" else [name.strip() for name in spec.split(",") if name.strip()]
+    return registry.warm_up(names, background=True)
@@ -0,0 +1,116 @@
+import os
+import re
+from io import BytesIO
+
+import requests
+from flask import current_app
+from fpdf import FPDF
+
+from services.youtube import extract_video_id
+
+
+class PDF(FPDF):
+    def __init__(self, video_url=None, video_title=None, thumbnail_url=None):
+        super().__init__()
+        self.video_url = video_url
+        self.video_title = video_title
+        self.thumbnail_url = thumbnail_url
+        self.video_id = extract_video_id(video_url) if video_url else None
+        self.set_margins(20, 20, 20)
+        self.set_auto_page_break(auto=True, margin=20)
+        self.font_family = 'helvetica'
+        try:
+            font_dir = os.path.join(current_app.root_path, 'templates', 'public', 'fonts')
+            arial_path = os.path.join(font_dir, 'arial.ttf')
+            if os.path.exists(arial_path):
+                self.add_font('Arial', '', arial_path, uni=True)
+                self.font_family = 'Arial'
+                arialbd_path = os.path.join(font_dir, 'G_ari_bd.TTF')
+                if os.path.exists(arialbd_path): self.add_font('Arial', 'B', arialbd_path, uni=True)
+                ariali_path = os.path.join(font_dir, 'G_ari_i.TTF')
+                if os.path.exists(ariali_path): self.add_font('Arial', 'I', ariali_path, uni=True)
+        except Exception as e:
+            print(f"PDF font loading error: {e}")
+
+    def header(self):
+        self.set_font(self.font_family, 'B', 10)
+        self.set_text_color(150, 150, 150)
+        self.cell(0, 10, 'Mindmap de la Vidéo', 0, 0, 'L')
+        logo_path = os.path.join(current_app.root_path, 'templates', 'public', 'Scriptou.png')
+        if os.path.exists(logo_path): self.image(logo_path, x=self.w - 30, y=15, w=10)
+        self.ln(15)
+
+    def footer(self):
+        self.set_y(-15)
+        self.set_font(self.font_family, 'I', 8)
+        self.set_text_color(150, 150, 150)
+        self.cell(0, 10, f'Page {self.page_no()}', 0, 0, 'C')
+
+    def add_title_page(self, main_title):
+        self.add_page()
+        if self.thumbnail_url:
+            try:
+                response = requests.get(self.thumbnail_url, stream=True)
+                if response.status_code == 200:
+                    img_buffer = BytesIO(response.content)
+                    self.image(img_buffer, x='C', y=30, w=self.w / 1.5)
+            except Exception as e:
+                pass
+        
+        self.set_y(self.get_y() + 100)
+        if self.video_title:
+            self.set_font(self.font_family, 'B', 24)
+            self.set_text_color(0, 0, 0)
+            self.multi_cell(0, 12, self.video_title, 0, 'C')
+            self.ln(10)
+
+        self.set_font(self.font_family, 'I', 16)
+        self.set_text_color(80, 80, 80)
+        self.multi_cell(0, 10, main_title, 0, 'C')
+
+    def write_with_links(self, text, font_size, style='', color=(50,50,50)):
+        self.set_font(self.font_family, style, font_size)
+        self.set_text_color(*color)
+        
+        clean_text = re.sub(r'\s*\(\d{1,2}:\d{2}(?:\d{2})?\)\s*$', '', text)
+        self.write(0, clean_text)
+
+        match_time = re.search(r'\((\d{1,2}:\d{2}(?:\d{2})?)\)', text)
+        if self.video_id and match_time:
+            timestamp = match_time.group(1)
+            time_parts = list(map(int, timestamp.split(':')))
+            seconds = sum(p * 60**i for i, p in enumerate(reversed(time_parts)))
+            youtube_link = f"https://www.youtube.com/watch?v={self.video_id}&t={seconds}s"
+            
+            self.set_x(self.get_x() + 2)
+            icon_path = os.path.join(current_app.root_path, 'templates', 'public', 'youtube_icon.png')
+            if os.path.exists(icon_path):
+                icon_height_user_unit = 3.5 / self.k
+                font_size_user_unit = font_size / self.k
+                
+                y_pos = self.get_y() - (font_size_user_unit / 4) - (icon_height_user_unit / 2)
+                
+                self.image(icon_path, x=self.get_x(), y=y_pos, h=icon_height_user_unit, link=youtube_link)
+
+    def add_heading(self, text, level):
+        font_sizes = { 2: 20, 3: 16, 4: 14, 5: 12, 6: 12 }
+        colors = { 2: (0, 0, 0), 3: (50, 50, 50), 4: (100, 100, 100), 5: (140, 140, 140), 6: (170, 170, 170) }
+        color = colors.get(level, (80, 80, 80))
+        
+        if level == 2: self.add_page()
+        
+        self.ln(10 if level == 2 else 5)
+        self.write_with_links(text, font_sizes.get(level, 12), 'B', color)
+        self.ln(5)
+
+    def add_bullet_item(self, text, indent_level):
+        bullet_colors = { 1: (30, 30, 30), 2: (80, 80, 80), 3: (130, 130, 130), }
+        color = bullet_colors.get(indent_level, (160, 160, 160))
+
+        self.ln(4)
+        indent = 25 + ((indent_level -1) * 8)
+        self.set_x(indent)
+        self.set_font(self.font_family, '', 11)
+        self.set_text_color(*color)
+        self.write(0, '• ')
+        self.write_with_links(text, 11, '', color)
@@ -0,0 +1,64 @@
+import os
+
+import numpy as np
+
+from services.clustering import normalize_rows
+from services.gemini import estimate_tokens
+from services.theme_naming import THEME_SAMPLE_SIZE
+
+# Budget approximatif de tokens des commentaires d'un thème dans le prompt de nommage
+THEME_SAMPLE_TOKEN_BUDGET = int(os.environ.get("THEME_SAMPLE_TOKEN_BUDGET", 600))
+# Au-delà, un commentaire est tronqué avant d'être placé dans le prompt
+THEME_SAMPLE_MAX_TOKENS = int(os.environ.get("THEME_SAMPLE_MAX_TOKENS", 120))
+# Poids de la diversité dans la sélection MMR (0: les plus proches du centroïde, 1: les plus variés)
+THEME_SAMPLE_DIVERSITY = float(os.environ.get("THEME_SAMPLE_DIVERSITY", 0.3))
+# Nombre de candidats (les plus proches du centroïde) considérés par la sélection MMR
+MMR_CANDIDATES = 50
+
+
+def truncate_to_tokens(text, max_tokens):
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    return text[:max_tokens * 4].rsplit(" ", 1)[0] + "…"
+
+
+def select_representatives(embeddings, texts, k=None, token_budget=None, diversity=None):
+    """Choisit les commentaires à montrer pour nommer un thème.
+
+    Candidats: les plus proches du centroïde du thème. Sélection par pertinence marginale maximale (MMR):
+    chaque nouveau commentaire maximise (1 - diversité) * proximité au centroïde - diversité * similarité
+    au plus proche déjà retenu. Les commentaires sont tronqués à THEME_SAMPLE_MAX_TOKENS et la sélection
+    s'arrête au budget de tokens. Retourne [(indice dans `texts`, texte éventuellement tronqué)].
+    """
+    k = k or THEME_SAMPLE_SIZE
+    token_budget = token_budget or THEME_SAMPLE_TOKEN_BUDGET
+    diversity = THEME_SAMPLE_DIVERSITY if diversity is None else diversity
+
+    vectors = normalize_rows(np.asarray(embeddings, dtype=np.float32))
+    centroid = vectors.mean(axis=0)
+    centroid /= max(np.linalg.norm(centroid), 1e-12)
+    relevance = vectors @ centroid
+
+    candidates = np.argsort(-relevance, kind='stable')[:MMR_CANDIDATES]
+    candidate_texts = {i: truncate_to_tokens(texts[i], THEME_SAMPLE_MAX_TOKENS) for i in candidates.tolist()}
+    max_similarity = np.full(len(candidates), -np.inf)
+    available = np.ones(len(candidates), dtype=bool)
+
+    selected, used_tokens = [], 0
+    while len(selected) < k and available.any():
+        if selected:
+            scores = (1 - diversity) * relevance[candidates] - diversity * max_similarity
+        else:
+            scores = relevance[candidates].copy()
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        available[best] = False
+
+        index = int(candidates[best])
+        tokens = estimate_tokens(candidate_texts[index])
+        if selected and used_tokens + tokens > token_budget:
+            continue
+        selected.append((index, candidate_texts[index]))
+        used_tokens += tokens
+        max_similarity = np.maximum(max_similarity, vectors[candidates] @ vectors[index])
+    return selected
@@ -0,0 +1,96 @@
+import os
+import time
+
+from services.cache import SQLiteCache, hash_key
+from services.text import normalize_text
+
+SENTIMENT_CACHE_TTL = int(os.environ.get("SENTIMENT_CACHE_TTL", 30 * 24 * 3600))
+SENTIMENT_CACHE_MAX_ENTRIES = int(os.environ.get("SENTIMENT_CACHE_MAX_ENTRIES", 1_000_000))
+# Taille des lots d'inférence (à ajuster selon le nombre de cœurs CPU)
+SENTIMENT_BATCH_SIZE = int(os.environ.get("SENTIMENT_BATCH_SIZE", 32))
+# Borne de sécurité: certains tokenizers déclarent une longueur maximale "infinie"
+SENTIMENT_MAX_TOKENS = 512
+
+# Cache partagé entre requêtes et workers: (modèle, hash du texte normalisé) -> {label, score}
+sentiment_cache = SQLiteCache('sentiment', ttl=SENTIMENT_CACHE_TTL, max_entries=SENTIMENT_CACHE_MAX_ENTRIES)
+
+
+def sentiment_text_key(text):
+    """Clé de déduplication: le modèle étant 'uncased', la casse n'influence pas le résultat."""
+    return normalize_text(text).lower()
+
+
+def run_sentiment_inference(sentiment_pipeline, texts, batch_size=None, stats=None):
+    """Inférence par lots triés par longueur en tokens (moins de padding), troncature faite par le tokenizer.
+
+    Retourne les résultats dans l'ordre de `texts`. `stats` (dict optionnel) reçoit le débit mesuré.
+    """
+    batch_size = batch_size or SENTIMENT_BATCH_SIZE
+    start = time.perf_counter()
+    if not texts:
+        return []
+
+    tokenizer = sentiment_pipeline.tokenizer
+    max_length = min(tokenizer.model_max_length, SENTIMENT_MAX_TOKENS)
+    token_lengths = [len(ids) for ids in tokenizer(texts, truncation=True, max_length=max_length)["input_ids"]]
+    order = sorted(range(len(texts)), key=lambda i: token_lengths[i])
+
+    sorted_results = sentiment_pipeline(
+        [texts[i] for i in order], batch_size=batch_size, truncation=True, max_length=max_length
+    )
+    results = [None] * len(texts)
+    for position, i in enumerate(order):
+        results[i] = sorted_results[position]
+
+    if stats is not None:
+        elapsed = time.perf_counter() - start
+        stats.update({
+            "inferred": len(texts),
+            "batch_size": batch_size,
+            "seconds": round(elapsed, 3),
+            "comments_per_second": round(len(texts) / elapsed, 1) if elapsed > 0 else None
+        })
+    return results
+
+
+def classify_sentiments(sentiment_pipeline, texts, model_name, stats=None, infer=None):
+    """Classe le sentiment de chaque texte en n'inférant qu'une fois chaque texte distinct absent du cache.
+
+    Retourne une liste de {'label', 'score'} alignée sur `texts`. `stats` (dict optionnel) reçoit
+    les volumes (total, distincts, en cache) et le débit de l'inférence. `infer(textes)` remplace
+    l'appel direct au pipeline (ex: micro-batcher partagé entre requêtes).
+    """
+    text_keys = [sentiment_text_key(text) for text in texts]
+    unique_keys = list(dict.fromkeys(text_keys))
+    cache_keys = {key: hash_key(model_name, key) for key in unique_keys}
+
+    cached = sentiment_cache.get_many(list(cache_keys.values()))
+    results_by_key = {key: cached[cache_keys[key]] for key in unique_keys if cache_keys[key] in cached}
+
+    to_infer = [key for key in unique_keys if key not in results_by_key]
+    if to_infer:
+        if infer is None:
+            inferred = run_sentiment_inference(sentiment_pipeline, to_infer, stats=stats)
+        else:
+            start = time.perf_counter()
+            inferred = infer(to_infer)
+            if stats is not None:
+                # Débit vu par la requête (attente du lot partagé comprise)
+                elapsed = time.perf_counter() - start
+                stats.update({
+                    "inferred": len(to_infer),
+                    "batch_size": SENTIMENT_BATCH_SIZE,
+                    "seconds": round(elapsed, 3),
+                    "comments_per_second": round(len(to_infer) / elapsed, 1) if elapsed > 0 else None,
+                    "micro_batched": True
+                })
+        new_entries = {}
+        for key, result in zip(to_infer, inferred):
+            entry = {"label": result['label'], "score": float(result['score'])}
+            results_by_key[key] = entry
+            new_entries[cache_keys[key]] = entry
+        sentiment_cache.set_many(new_entries)
+
+    if stats is not None:
+        stats.update({"total": len(texts), "distinct": len(unique_keys), "cached": len(unique_keys) - len(to_infer)})
+    return [results_by_key[key] for key in text_keys]
@@ -0,0 +1,226 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from services.gemini import estimate_tokens, generate_with_retry, json_generation_config
+
+# Nombre d'appels Gemini simultanés pour le nommage des thèmes
+THEME_NAMING_CONCURRENCY = int(os.environ.get("THEME_NAMING_CONCURRENCY", 8))
+# Délai maximal d'un appel (secondes) et nombre de nouvelles tentatives en cas d'erreur
+THEME_NAMING_TIMEOUT = float(os.environ.get("THEME_NAMING_TIMEOUT", 30))
+THEME_NAMING_RETRIES = int(os.environ.get("THEME_NAMING_RETRIES", 2))
+THEME_NAMING_BACKOFF = float(os.environ.get("THEME_NAMING_BACKOFF", 1.0))
+
+# 'batch': un seul appel pour tous les thèmes (découpé selon le budget de tokens), 'parallel': un appel par thème,
+# 'off': pas d'appel Gemini, noms construits à partir des mots-clés
+THEME_NAMING_MODE = os.environ.get("THEME_NAMING_MODE", "batch")
+# Budget approximatif de tokens d'entrée par appel groupé
+THEME_NAMING_TOKEN_BUDGET = int(os.environ.get("THEME_NAMING_TOKEN_BUDGET", 8000))
+
+THEME_SAMPLE_SIZE = 10
+
+
+def format_theme_samples(theme_comments):
+    return "\n".join([f"- {c['text']}" for c in theme_comments[:THEME_SAMPLE_SIZE]])
+
+
+def build_theme_prompt(theme_comments):
+    sample_comments_text = format_theme_samples(theme_comments)
+    return (
+        "Analyse en profondeur les commentaires suivants, qui appartiennent tous au même groupe sémantique. "
+        "Identifie le sujet PRÉCIS et SPÉCIFIQUE qui les unit. Ton objectif est de trouver le concept le plus saillant et distinctif. "
+        "Réponds IMPÉRATIVEMENT au format JSON suivant, sans aucun texte supplémentaire: "
+        "{\"theme_name\": \"Titre de 2-4 mots capturant l'idée centrale\", \"theme_summary\": \"Un résumé d'une phrase qui explique le thème.\"} "
+        "Évite les titres génériques comme 'Avis sur le produit' ou 'Questions des utilisateurs'. Sois spécifique.\n\n"
+        f"Commentaires à analyser:\n{sample_comments_text}"
+    )
+
+
+def default_theme_name(theme_id):
+    return f"Thème {theme_id}"
+
+
+def parse_theme_response(response_text, theme_id):
+    """Extrait (nom, résumé) de la réponse JSON de Gemini, avec des valeurs par défaut si elle n'est pas conforme."""
+    start_index = response_text.find('{')
+    end_index = response_text.rfind('}')
+    if start_index != -1 and end_index != -1:
+        theme_info = json.loads(response_text[start_index:end_index+1])
+        return (
+            theme_info.get("theme_name") or default_theme_name(theme_id),
+            theme_info.get("theme_summary") or "Pas de résumé."
+        )
+    return default_theme_name(theme_id), "Réponse non-JSON."
+
+
+def generate_theme_json(gemini_model, prompt):
+    """Appel Gemini (réponse JSON) avec le délai et les nouvelles tentatives du nommage des thèmes."""
+    return generate_with_retry(
+        gemini_model, prompt, json_generation_config(),
+        timeout=THEME_NAMING_TIMEOUT, retries=THEME_NAMING_RETRIES, backoff=THEME_NAMING_BACKOFF
+    )
+
+
+def name_theme(gemini_model, theme_id, theme_comments):
+    try:
+        gemini_response = generate_theme_json(gemini_model, build_theme_prompt(theme_comments))
+        return parse_theme_response(gemini_response.text, theme_id)
+    except Exception as e_gemini:
+        return default_theme_name(theme_id), f"Erreur Gemini: {str(e_gemini)}"
+
+
+def name_themes_parallel(gemini_model, grouped_comments, on_named=None):
+    """Nomme les thèmes en parallèle (THEME_NAMING_CONCURRENCY appels au plus).
+
+    `grouped_comments` est une liste de (theme_id, commentaires). Retourne la liste des (nom, résumé)
+    dans le même ordre. `on_named(nombre_terminés)` est appelé à chaque thème nommé.
+    """
+    results = [None] * len(grouped_comments)
+    if not grouped_comments:
+        return results
+
+    max_workers = max(1, min(THEME_NAMING_CONCURRENCY, len(grouped_comments)))
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="theme-naming") as executor:
+        futures = {
+            executor.submit(name_theme, gemini_model, theme_id, theme_comments): index
+            for index, (theme_id, theme_comments) in enumerate(grouped_comments)
+        }
+        for completed, future in enumerate(as_completed(futures), start=1):
+            results[futures[future]] = future.result()
+            if on_named:
+                on_named(completed)
+    return results
+
+
+BATCH_PROMPT_PREAMBLE = (
+    "Tu reçois plusieurs groupes de commentaires. Chaque groupe rassemble des commentaires du même groupe sémantique. "
+    "Pour CHAQUE groupe, identifie le sujet PRÉCIS et SPÉCIFIQUE qui unit ses commentaires. "
+    "Évite les titres génériques comme 'Avis sur le produit' ou 'Questions des utilisateurs'. Sois spécifique. "
+    "Réponds IMPÉRATIVEMENT avec un tableau JSON, sans aucun texte supplémentaire, contenant un objet par groupe: "
+    "[{\"themeId\": <identifiant du groupe>, \"theme_name\": \"Titre de 2-4 mots capturant l'idée centrale\", "
+    "\"theme_summary\": \"Un résumé d'une phrase qui explique le thème.\"}]\n\n"
+)
+
+
+def format_theme_block(theme_id, theme_comments):
+    return f"### Groupe {int(theme_id)}\n{format_theme_samples(theme_comments)}\n\n"
+
+
+def chunk_themes(grouped_comments, token_budget=None):
+    """Regroupe les indices des thèmes en lots dont le prompt estimé reste sous le budget de tokens."""
+    token_budget = token_budget or THEME_NAMING_TOKEN_BUDGET
+    available = max(1, token_budget - estimate_tokens(BATCH_PROMPT_PREAMBLE))
+    chunks, current, current_tokens = [], [], 0
+    for index, (theme_id, theme_comments) in enumerate(grouped_comments):
+        block_tokens = estimate_tokens(format_theme_block(theme_id, theme_comments))
+        if current and current_tokens + block_tokens > available:
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append(index)
+        current_tokens += block_tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def parse_batch_response(response_text, expected_ids):
+    """Valide le tableau JSON retourné et retourne {theme_id: (nom, résumé)} pour les éléments conformes."""
+    start_index = response_text.find('[')
+    end_index = response_text.rfind(']')
+    if start_index == -1 or end_index == -1:
+        return {}
+    try:
+        items = json.loads(response_text[start_index:end_index+1])
+    except json.JSONDecodeError:
+        return {}
+
+    parsed = {}
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict):
+            continue
+        try:
+            theme_id = int(item.get("themeId"))
+        except (TypeError, ValueError):
+            continue
+        theme_name = item.get("theme_name")
+        theme_summary = item.get("theme_summary")
+        if theme_id in expected_ids and isinstance(theme_name, str) and theme_name.strip() and isinstance(theme_summary, str):
+            parsed[theme_id] = (theme_name.strip(), theme_summary.strip() or "Pas de résumé.")
+    return parsed
+
+
+def name_theme_chunk(gemini_model, chunk_themes_list):
+    """Nomme un lot de thèmes en un seul appel. Les thèmes absents ou invalides dans la réponse ne sont pas retournés."""
+    prompt = BATCH_PROMPT_PREAMBLE + "".join(
+        format_theme_block(theme_id, theme_comments) for theme_id, theme_comments in chunk_themes_list
+    )
+    gemini_response = generate_theme_json(gemini_model, prompt)
+    expected_ids = {int(theme_id) for theme_id, _ in chunk_themes_list}
+    return parse_batch_response(gemini_response.text, expected_ids)
+
+
+def name_themes_batched(gemini_model, grouped_comments, on_named=None):
+    """Nomme les thèmes par lots (un appel par lot), puis thème par thème pour ceux dont la réponse est invalide."""
+    results = [None] * len(grouped_comments)
+    if not grouped_comments:
+        return results
+
+    chunks = chunk_themes(grouped_comments)
+    named = 0
+    max_workers = max(1, min(THEME_NAMING_CONCURRENCY, len(chunks)))
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="theme-naming") as executor:
+        futures = {
+            executor.submit(name_theme_chunk, gemini_model, [grouped_comments[i] for i in chunk]): chunk
+            for chunk in chunks
+        }
+        for future in as_completed(futures):
+            chunk = futures[future]
+            try:
+                parsed = future.result()
+            except Exception as e_gemini:
+                # Erreur d'appel (après les nouvelles tentatives): inutile d'insister thème par thème
+                parsed = {
+                    int(grouped_comments[i][0]): (default_theme_name(grouped_comments[i][0]), f"Erreur Gemini: {str(e_gemini)}")
+                    for i in chunk
+                }
+            for i in chunk:
+                theme_id = int(grouped_comments[i][0])
+                if theme_id in parsed:
+                    results[i] = parsed[theme_id]
+                    named += 1
+            if on_named:
+                on_named(named)
+
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        already_named = named
+        fallback = name_themes_parallel(
+            gemini_model, [grouped_comments[i] for i in missing],
+            on_named=(lambda count: on_named(already_named + count)) if on_named else None
+        )
+        for i, result in zip(missing, fallback):
+            results[i] = result
+    return results
+
+
+def name_themes(gemini_model, grouped_comments, on_named=None, fallback_names=None):
+    """Nomme les thèmes selon THEME_NAMING_MODE. Retourne les (nom, résumé) dans l'ordre de `grouped_comments`.
+
+    `fallback_names` ({theme_id: nom}, ex: mots-clés c-TF-IDF) remplace le nom par défaut des thèmes que
+    Gemini n'a pas pu nommer, ou de tous les thèmes si Gemini est désactivé ou indisponible.
+    """
+    fallback_names = fallback_names or {}
+    if gemini_model is None or THEME_NAMING_MODE == "off":
+        results = [(default_theme_name(theme_id), "Thème identifié localement par mots-clés.") for theme_id, _ in grouped_comments]
+        if on_named:
+            on_named(len(grouped_comments))
+    elif THEME_NAMING_MODE == "parallel":
+        results = name_themes_parallel(gemini_model, grouped_comments, on_named=on_named)
+    else:
+        results = name_themes_batched(gemini_model, grouped_comments, on_named=on_named)
+
+    return [
+        (fallback_names.get(int(theme_id)) or theme_name, theme_summary)
+        if theme_name == default_theme_name(theme_id) else (theme_name, theme_summary)
+        for (theme_id, _), (theme_name, theme_summary) in zip(grouped_comments, results)
+    ]
@@ -0,0 +1,99 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from services.gemini import estimate_tokens, generate_with_retry, response_text, response_usage
+
+# Au-delà de ce nombre de tokens estimés, la transcription est résumée par morceaux (map) puis fusionnée (reduce)
+TRANSCRIPT_MAP_REDUCE_THRESHOLD = int(os.environ.get("TRANSCRIPT_MAP_REDUCE_THRESHOLD", 60000))
+# Taille visée d'un morceau et nombre d'appels simultanés de l'étape map
+TRANSCRIPT_CHUNK_TOKENS = int(os.environ.get("TRANSCRIPT_CHUNK_TOKENS", 15000))
+TRANSCRIPT_MAP_CONCURRENCY = int(os.environ.get("TRANSCRIPT_MAP_CONCURRENCY", 6))
+# Délai maximal d'un appel map (secondes) et nouvelles tentatives en cas d'erreur
+TRANSCRIPT_MAP_TIMEOUT = float(os.environ.get("TRANSCRIPT_MAP_TIMEOUT", 180))
+TRANSCRIPT_MAP_RETRIES = int(os.environ.get("TRANSCRIPT_MAP_RETRIES", 2))
+TRANSCRIPT_MAP_BACKOFF = float(os.environ.get("TRANSCRIPT_MAP_BACKOFF", 2.0))
+# Nombre maximal de passes map (si les notes fusionnées dépassent encore le seuil)
+TRANSCRIPT_MAX_MAP_PASSES = 3
+
+_TIMESTAMP_RE = re.compile(r"^\((\d{2}:\d{2}:\d{2})\)")
+
+MAP_PROMPT = (
+    "Tu reçois un extrait d'une transcription vidéo horodatée (de {start} à {end}). "
+    "Rédige des notes détaillées et fidèles de cet extrait: idées, arguments, exemples, chiffres et conclusions, "
+    "dans l'ordre chronologique, sans rien inventer. "
+    "Chaque note commence IMPÉRATIVEMENT par l'horodatage exact du passage concerné, recopié de la transcription "
+    "au format (HH:MM:SS), par exemple: (00:12:34) L'intervenant explique que...\n\n"
+    "Extrait:\n{chunk}"
+)
+
+REDUCE_PREAMBLE = (
+    "Note: la transcription ci-dessous a été condensée en notes horodatées, extrait par extrait, dans l'ordre "
+    "chronologique. Conserve les horodatages (HH:MM:SS) tels quels lorsque tu les cites.\n\n"
+)
+
+
+def needs_map_reduce(transcript_text, threshold=None):
+    return estimate_tokens(transcript_text) > (threshold or TRANSCRIPT_MAP_REDUCE_THRESHOLD)
+
+
+def split_transcript(transcript_text, chunk_tokens=None):
+    """Découpe la transcription en morceaux de lignes entières (segments horodatés).
+
+    Retourne [(texte, horodatage de début, horodatage de fin)]; les horodatages valent None si absents.
+    """
+    chunk_tokens = chunk_tokens or TRANSCRIPT_CHUNK_TOKENS
+    chunks, lines, tokens = [], [], 0
+    for line in transcript_text.splitlines():
+        line_tokens = estimate_tokens(line)
+        if lines and tokens + line_tokens > chunk_tokens:
+            chunks.append(lines)
+            lines, tokens = [], 0
+        lines.append(line)
+        tokens += line_tokens
+    if lines:
+        chunks.append(lines)
+
+    result = []
+    for chunk_lines in chunks:
+        timestamps = [match.group(1) for match in map(_TIMESTAMP_RE.match, chunk_lines) if match]
+        result.append((
+            "\n".join(chunk_lines),
+            timestamps[0] if timestamps else None,
+            timestamps[-1] if timestamps else None
+        ))
+    return result
+
+
+def _map_chunk(gemini_model, chunk):
+    text, start, end = chunk
+    prompt = MAP_PROMPT.format(start=start or "début", end=end or "fin", chunk=text)
+    gemini_response = generate_with_retry(
+        gemini_model, prompt,
+        timeout=TRANSCRIPT_MAP_TIMEOUT, retries=TRANSCRIPT_MAP_RETRIES, backoff=TRANSCRIPT_MAP_BACKOFF
+    )
+    return response_text(gemini_response), response_usage(gemini_response)
+
+
+def condense_transcript(gemini_model, transcript_text, usages, threshold=None, force=False):
+    """Étape map: remplace la transcription par des notes horodatées, morceau par morceau, en parallèle.
+
+    Répétée tant que le résultat dépasse le seuil (`force`: au moins une passe). L'usage de chaque appel
+    est ajouté à `usages`.
+    """
+    text = transcript_text
+    for map_pass in range(TRANSCRIPT_MAX_MAP_PASSES):
+        if not (force and map_pass == 0) and not needs_map_reduce(text, threshold):
+            break
+        chunks = split_transcript(text)
+        max_workers = max(1, min(TRANSCRIPT_MAP_CONCURRENCY, len(chunks)))
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="transcript-map") as executor:
+            results = list(executor.map(lambda chunk: _map_chunk(gemini_model, chunk), chunks))
+        usages.extend(usage for _, usage in results)
+        text = "\n\n".join(notes.strip() for notes, _ in results)
+    return text
+
+
+def build_reduce_prompt(prompt_template, notes):
+    """Étape reduce: le prompt de l'utilisateur appliqué aux notes fusionnées."""
+    return prompt_template.replace("{transcript}", REDUCE_PREAMBLE + notes)
@@ -0,0 +1,164 @@
+"""Classement des mots (et n-grammes) les plus fréquents dans les commentaires.
+
+Micro-benchmark sur des commentaires synthétiques:
+    python -m services.word_ranking --comments 100000 [--ngrams 3]
+"""
+import argparse
+import os
+import random
+import re
+import string
+import time
+from collections import Counter
+from itertools import chain, islice
+
+STOP_WORDS = frozenset([
+    'a', 'à', 'alors', 'au', 'aucuns', 'aussi', 'autre', 'avant', 'avec', 'avoir', 'bon', 'car', 'ce', 'cela',
+    'ces', 'ceux', 'chaque', 'ci', 'comme', 'comment', 'dans', 'de', 'des', 'du', 'dedans', 'dehors', 'depuis',
+    'devrait', 'doit', 'donc', 'dos', 'début', 'elle', 'elles', 'en', 'encore', 'essai', 'est', 'et', 'eu', 'fait',
+    'faites', 'fois', 'font', 'hors', 'ici', 'il', 'ils', 'je', 'juste', 'la', 'le', 'les', 'leur', 'là', 'ma',
+    'maintenant', 'mais', 'mes', 'mien', 'moins', 'mon', 'mot', 'même', 'ni', 'nommés', 'notre', 'nous', 'nouveaux',
+    'ou', 'où', 'par', 'parce', 'pas', 'peut', 'peu', 'plupart', 'pour', 'pourquoi', 'quand', 'que', 'quel',
+    'quelle', 'quelles', 'quels', 'qui', 'sa', 'sans', 'ses', 'seulement', 'si', 'sien', 'son', 'sont', 'sous',
+    'soyez', 'sujet', 'sur', 'ta', 'tandis', 'tellement', 'tels', 'tes', 'ton', 'tous', 'tout', 'trop', 'très',
+    'tu', 'voient', 'vont', 'votre', 'vous', 'vu', 'ça', 'étaient', 'état', 'étions', 'été', 'être', 'i', 'me',
+    'my', 'myself', 'we', 'our', 'ours', 'ourselves', 'you', 'your', 'yours', 'yourself', 'yourselves', 'he', 'him',
+    'his', 'himself', 'she', 'her', 'hers', 'herself', 'it', 'its', 'itself', 'they', 'them', 'their', 'theirs',
+    'themselves', 'what', 'which', 'who', 'whom', 'this', 'that', 'these', 'those', 'am', 'is', 'are', 'was',
+    'were', 'be', 'been', 'being', 'have', 'has', 'had', 'having', 'do', 'does', 'did', 'doing', 'an', 'the', 'and',
+    'but', 'if', 'or', 'because', 'as', 'until', 'while', 'of', 'at', 'by', 'for', 'with', 'about', 'against',
+    'between', 'into', 'through', 'during', 'before', 'after', 'above', 'below', 'to', 'from', 'up', 'down', 'in',
+    'out', 'on', 'off', 'over', 'under', 'again', 'further', 'then', 'once', 'here', 'there', 'when', 'where',
+    'why', 'how', 'all', 'any', 'both', 'each', 'few', 'more', 'most', 'other', 'some', 'such', 'no', 'nor', 'not',
+    'only', 'own', 'same', 'so', 'than', 'too', 'very', 's', 't', 'can', 'will', 'just', 'don', 'should', 'now',
+    'd', 'll', 'm', 'o', 're', 've', 'y', 'ain', 'aren', 'couldn', 'didn', 'doesn', 'hadn', 'hasn', 'haven', 'isn',
+    'mightn', 'mustn', 'needn', 'shan', 'shouldn', 'wasn', 'weren', 'won', 'wouldn', 'une',
+    # Fragments de plus de deux lettres isolés par l'apostrophe ("jusqu'à", "lorsqu'il", "quelqu'un", "aujourd'hui")
+    'jusqu', 'lorsqu', 'puisqu', 'quoiqu', 'quelqu', 'aujourd', 'hui'
+])
+
+MIN_WORD_LENGTH = 3
+# Taille maximale des n-grammes comptés dans la réponse d'analyse (1: mots seuls)
+WORD_RANKING_MAX_NGRAM = int(os.environ.get("WORD_RANKING_MAX_NGRAM", 1))
+
+# Mots Unicode (lettres et chiffres, sans '_'): emoji, guillemets « » et ponctuation typographique sont ignorés
+_TOKEN_RE = re.compile(r"[^\W_]+")
+# textDisplay de l'API YouTube est du HTML: balises et entités (dont l'apostrophe &#39;) remplacées par des espaces
+_HTML_MARKUP_RE = re.compile(r"<[^>\n]+>|&#?\w+;")
+# Nombre de textes concaténés avant tokenisation (une seule passe regex par bloc)
+_CHUNK_SIZE = 2000
+
+
+def tokenize(text):
+    """Mots en minuscules d'un texte (commentaire brut ou HTML de textDisplay).
+
+    Les apostrophes séparent les mots: "l'équipe" donne "l" et "équipe", la particule élidée étant
+    ensuite écartée par MIN_WORD_LENGTH ou STOP_WORDS.
+    """
+    if "&" in text or "<" in text:
+        text = _HTML_MARKUP_RE.sub(" ", text)
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _is_content_word(word):
+    return len(word) >= MIN_WORD_LENGTH and word not in STOP_WORDS
+
+
+def iter_terms(tokens, ngram_range):
+    min_n, max_n = ngram_range
+    for n in range(min_n, max_n + 1):
+        if n == 1:
+            yield from (word for word in tokens if _is_content_word(word))
+            continue
+        for i in range(len(tokens) - n + 1):
+            # Un n-gramme ne commence ni ne finit par un mot vide ("la vidéo de" est ignoré, "qualité du montage" gardé)
+            if _is_content_word(tokens[i]) and _is_content_word(tokens[i + n - 1]):
+                yield " ".join(tokens[i:i + n])
+
+
+def _count_terms(texts, ngram_range):
+    if ngram_range == (1, 1):
+        # Tokenisation par blocs de textes concaténés, comptage de tous les mots (boucle C de Counter),
+        # puis filtrage sur les seuls mots distincts
+        word_counts = Counter()
+        texts = iter(texts)
+        while True:
+            chunk = list(islice(texts, _CHUNK_SIZE))
+            if not chunk:
+                break
+            word_counts.update(tokenize("\n".join(chunk)))
+        for word in [word for word in word_counts if not _is_content_word(word)]:
+            del word_counts[word]
+        return word_counts
+    return Counter(chain.from_iterable(iter_terms(tokenize(text), ngram_range) for text in texts))
+
+
+def get_word_ranking(texts, top_n=50, ngram_range=(1, 1), weights=None):
+    """Retourne les `top_n` termes les plus fréquents [(terme, occurrences)].
+
+    `ngram_range=(1, 3)` compte aussi bigrammes et trigrammes. `weights` (facultatif) donne la multiplicité
+    de chaque texte (ex: nombre de doublons regroupés). Le comptage se fait au fil des textes,
+    sans liste intermédiaire de tous les mots.
+    """
+    if weights is None:
+        return _count_terms(texts, ngram_range).most_common(top_n)
+
+    word_counts = _count_terms((text for text, weight in zip(texts, weights) if weight == 1), ngram_range)
+    for text, weight in zip(texts, weights):
+        if weight != 1:
+            for term, count in _count_terms([text], ngram_range).items():
+                word_counts[term] += count * int(weight)
+    return word_counts.most_common(top_n)
+
+
+def _legacy_word_ranking(texts, top_n=50):
+    # Implémentation précédente, conservée pour comparaison dans le benchmark
+    all_words = []
+    translator = str.maketrans('', '', string.punctuation)
+    for text in texts:
+        words = text.lower().translate(translator).split()
+        all_words.extend(word for word in words if word not in STOP_WORDS and len(word) > 2)
+    return Counter(all_words).most_common(top_n)
+
+
+def synthetic_comments(count, seed=0):
+    """Commentaires synthétiques mêlant mots courants, mots vides, ponctuation Unicode, emoji et HTML."""
+    rng = random.Random(seed)
+    vocabulary = ["vidéo", "montage", "son", "qualité", "merci", "tutoriel", "explication", "musique", "super",
+                  "incroyable", "question", "micro", "caméra", "épisode", "podcast", "invité", "great", "video",
+                  "sound", "editing", "thanks", "2024", "français", "sous-titres", "lumière", "rythme"]
+    fillers = ["le", "la", "de", "et", "c'est", "j’ai", "vraiment", "the", "is", "a", "«", "»", "!", "?", "👏", "😂", "<br>", "&#39;"]
+    return [
+        " ".join(rng.choice(vocabulary) if rng.random() < 0.5 else rng.choice(fillers) for _ in range(rng.randint(4, 40)))
+        for _ in range(count)
+    ]
+
+
+def benchmark(count=100_000, max_ngram=1, repeat=3):
+    texts = synthetic_comments(count)
+    timings = {}
+    for name, run in (
+        ("legacy", lambda: _legacy_word_ranking(texts)),
+        ("unigrams", lambda: get_word_ranking(texts)),
+        (f"ngrams_1_{max_ngram}", lambda: get_word_ranking(texts, ngram_range=(1, max_ngram))),
+    ):
+        if name.startswith("ngrams") and max_ngram == 1:
+            continue
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            best = min(best, time.perf_counter() - start)
+        timings[name] = best
+    return timings
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Micro-benchmark du classement des mots.")
+    parser.add_argument("--comments", type=int, default=100_000)
+    parser.add_argument("--ngrams", type=int, default=1, help="Taille maximale des n-grammes (1 à 3)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for name, seconds in benchmark(args.comments, args.ngrams, args.repeat).items():
+        print(f"{name}: {seconds:.3f}s ({args.comments / seconds:,.0f} commentaires/s)")
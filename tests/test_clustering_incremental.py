@@ -0,0 +1,221 @@
+"""Réutilisation des modèles de regroupement par vidéo (cluster_incremental) avec UMAP / HDBSCAN factices.
+
+Le HDBSCAN factice classe chaque point selon le signe de sa première coordonnée (0 si positive, 1 sinon);
+approximate_predict classe en bruit (-1) les points proches de zéro.
+"""
+import numpy as np
+import pytest
+
+from services import clustering
+from services.cluster_store import ClusterModelStore
+
+
+class FakeClusterer:
+    def __init__(self, min_cluster_size, prediction_data=False, **kwargs):
+        self.prediction_data = prediction_data
+
+    def fit(self, points):
+        self.labels_ = (points[:, 0] < 0).astype(int)
+        return self
+
+
+class FakeHdbscan:
+    HDBSCAN = FakeClusterer
+
+    def __init__(self):
+        self.predicted = 0
+
+    def approximate_predict(self, clusterer, points):
+        self.predicted += len(points)
+        labels = (points[:, 0] < 0).astype(int)
+        labels[np.abs(points[:, 0]) < 0.1] = -1
+        return labels, np.ones(len(points))
+
+
+class FakeReducer:
+    def __init__(self, **kwargs):
+        self.transformed = 0
+
+    def fit_transform(self, points):
+        return clustering.normalize_rows(points)[:, :clustering.UMAP_COMPONENTS]
+
+    def transform(self, points):
+        self.transformed += len(points)
+        return clustering.normalize_rows(points)[:, :clustering.UMAP_COMPONENTS]
+
+
+class FakeUmap:
+    UMAP = FakeReducer
+
+
+class FakeRegistry:
+    def __init__(self):
+        self.modules = {'hdbscan': FakeHdbscan(), 'umap': FakeUmap()}
+
+    def get(self, name):
+        return self.modules[name]
+
+
+@pytest.fixture
+def fake_registry(monkeypatch):
+    registry = FakeRegistry()
+    monkeypatch.setattr(clustering, 'registry', registry)
+    return registry
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ClusterModelStore(directory=str(tmp_path))
+
+
+def clustered_points(n_points, seed=0):
+    """Deux groupes bien séparés (première coordonnée à +1 ou -1)."""
+    rng = np.random.default_rng(seed)
+    points = 0.01 * rng.normal(size=(n_points, 8))
+    points[:, 0] = np.where(np.arange(n_points) % 2 == 0, 1.0, -1.0)
+    points[:, 1] = 1.0
+    return points.astype(np.float32)
+
+
+def noise_points(n_points):
+    """Points que l'approximate_predict factice classe en bruit."""
+    points = np.zeros((n_points, 8), dtype=np.float32)
+    points[:, 1] = 1.0
+    return points
+
+
+def keys_for(n_points, prefix="c"):
+    return [f"{prefix}{i}" for i in range(n_points)]
+
+
+def test_refit_reason_without_model():
+    assert clustering._refit_reason(None, 100, 0, None) == "no_model"
+
+
+def test_first_analysis_fits_and_saves_state(fake_registry, store):
+    points = clustered_points(100)
+    labels, info = clustering.cluster_incremental(store, "video", keys_for(100), points)
+
+    assert info["incremental"] is False
+    assert info["refit_reason"] == "no_model"
+    assert list(labels[:4]) == [0, 1, 0, 1]
+    state = store.load("video")
+    assert state["fitted_points"] == 100
+    assert state["added_since_fit"] == 0
+    assert state["noise_ratio"] == 0.0
+    assert state["labels"]["c1"] == 1
+
+
+def test_known_comments_keep_their_labels_and_new_ones_are_predicted(fake_registry, store):
+    points = clustered_points(110)
+    keys = keys_for(110)
+    clustering.cluster_incremental(store, "video", keys[:100], points[:100])
+    # Étiquette persistée différente de ce que donnerait un nouvel ajustement: elle doit être conservée
+    state = store.load("video")
+    state["labels"]["c0"] = 7
+    store.save("video", state)
+
+    labels, info = clustering.cluster_incremental(store, "video", keys, points)
+
+    assert info["incremental"] is True
+    assert info["new_points"] == 10
+    assert labels[0] == 7
+    assert list(labels[100:104]) == [0, 1, 0, 1]
+    assert fake_registry.modules['hdbscan'].predicted == 10
+    state = store.load("video")
+    assert state["added_since_fit"] == 10
+    assert state["labels"]["c109"] == 1
+
+
+def test_unchanged_comments_reuse_everything(fake_registry, store):
+    points = clustered_points(100)
+    clustering.cluster_incremental(store, "video", keys_for(100), points)
+
+    labels, info = clustering.cluster_incremental(store, "video", keys_for(100), points)
+
+    assert info["incremental"] is True
+    assert info["new_points"] == 0
+    assert fake_registry.modules['hdbscan'].predicted == 0
+
+
+def test_too_many_new_comments_trigger_a_refit(fake_registry, store):
+    points = clustered_points(130)
+    keys = keys_for(130)
+    clustering.cluster_incremental(store, "video", keys[:100], points[:100])
+
+    _, info = clustering.cluster_incremental(store, "video", keys, points)
+
+    assert info["incremental"] is False
+    assert info["refit_reason"] == "new_ratio"
+    assert store.load("video")["fitted_points"] == 130
+
+
+def test_new_comments_accumulate_across_analyses(fake_registry, store):
+    points = clustered_points(125)
+    keys = keys_for(125)
+    clustering.cluster_incremental(store, "video", keys[:100], points[:100])
+    _, info = clustering.cluster_incremental(store, "video", keys[:115], points[:115])
+    assert info["incremental"] is True
+
+    # 15 + 10 nouveaux commentaires depuis l'ajustement: 25 % > CLUSTER_REFIT_NEW_RATIO
+    _, info = clustering.cluster_incremental(store, "video", keys, points)
+
+    assert info["refit_reason"] == "new_ratio"
+
+
+def test_strategy_change_triggers_a_refit(fake_registry, store, monkeypatch):
+    monkeypatch.setattr(clustering, 'CLUSTERING_SMALL_MAX', 100)
+    points = clustered_points(110)
+    keys = keys_for(110)
+    _, info = clustering.cluster_incremental(store, "video", keys[:100], points[:100])
+    assert info["strategy"] == "direct"
+
+    _, info = clustering.cluster_incremental(store, "video", keys, points)
+
+    assert info["refit_reason"] == "strategy"
+    assert info["strategy"] == "umap"
+    assert store.load("video")["reducer"] is not None
+
+
+def test_reused_umap_reducer_projects_new_comments(fake_registry, store, monkeypatch):
+    monkeypatch.setattr(clustering, 'CLUSTERING_SMALL_MAX', 50)
+    points = clustered_points(110)
+    keys = keys_for(110)
+    clustering.cluster_incremental(store, "video", keys[:100], points[:100])
+
+    _, info = clustering.cluster_incremental(store, "video", keys, points)
+
+    assert info["incremental"] is True
+    assert info["strategy"] == "umap"
+
+
+def test_new_comments_drifting_to_noise_trigger_a_refit(fake_registry, store):
+    points = np.vstack([clustered_points(200), noise_points(clustering.CLUSTER_DRIFT_MIN_POINTS)])
+    keys = keys_for(len(points))
+    clustering.cluster_incremental(store, "video", keys[:200], points[:200])
+
+    _, info = clustering.cluster_incremental(store, "video", keys, points)
+
+    assert info["incremental"] is False
+    assert info["refit_reason"] == "drift"
+
+
+def test_few_noisy_comments_are_not_drift(fake_registry, store):
+    points = np.vstack([clustered_points(200), noise_points(clustering.CLUSTER_DRIFT_MIN_POINTS - 1)])
+    keys = keys_for(len(points))
+    clustering.cluster_incremental(store, "video", keys[:200], points[:200])
+
+    labels, info = clustering.cluster_incremental(store, "video", keys, points)
+
+    assert info["incremental"] is True
+    assert (labels[200:] == -1).all()
+
+
+def test_refit_requested(fake_registry, store):
+    points = clustered_points(100)
+    clustering.cluster_incremental(store, "video", keys_for(100), points)
+
+    _, info = clustering.cluster_incremental(store, "video", keys_for(100), points, refit=True)
+
+    assert info["incremental"] is False
+    assert info["refit_reason"] == "refit_requested"
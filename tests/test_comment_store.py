@@ -0,0 +1,178 @@
+"""Synchronisation incrémentale des commentaires (arrêt au premier commentaire connu, resynchro complète).
+
+Le service YouTube factice sert un fil trié du plus récent au plus ancien, par pages de PAGE_SIZE commentaires.
+"""
+import pytest
+
+from services import comment_store
+from services.comment_store import CommentStore
+
+PAGE_SIZE = 3
+
+
+def make_thread(index, likes=0):
+    return {
+        'id': f"c{index}",
+        'snippet': {'topLevelComment': {'snippet': {
+            'textDisplay': f"commentaire {index}",
+            'authorDisplayName': f"auteur {index}",
+            'publishedAt': f"2024-01-01T00:{index:02d}:00Z",
+            'likeCount': likes
+        }}}
+    }
+
+
+class FakeRequest:
+    def __init__(self, response):
+        self.response = response
+
+    def execute(self):
+        return self.response
+
+
+class FakeYoutube:
+    """Fil de commentaires modifiable entre deux synchros; compte les appels à commentThreads().list."""
+
+    def __init__(self, indices):
+        self.threads = [make_thread(i) for i in sorted(indices, reverse=True)]
+        self.calls = 0
+
+    def post(self, *indices):
+        self.threads = [make_thread(i) for i in sorted(indices, reverse=True)] + self.threads
+
+    def delete(self, index):
+        self.threads = [t for t in self.threads if t['id'] != f"c{index}"]
+
+    def commentThreads(self):
+        return self
+
+    def list(self, part, videoId, maxResults, order, pageToken=None):
+        self.calls += 1
+        start = int(pageToken or 0)
+        response = {'items': self.threads[start:start + PAGE_SIZE]}
+        if start + PAGE_SIZE < len(self.threads):
+            response['nextPageToken'] = str(start + PAGE_SIZE)
+        return FakeRequest(response)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CommentStore(path=str(tmp_path / "comments.sqlite3"))
+
+
+def ids(comments):
+    return [c['id'] for c in comments]
+
+
+def test_first_sync_fetches_the_whole_thread(store):
+    youtube = FakeYoutube(range(1, 8))
+
+    comments, stats = store.sync(youtube, "video")
+
+    assert ids(comments) == [f"c{i}" for i in range(7, 0, -1)]
+    assert stats == {"mode": "full", "api_calls": 3, "new_comments": 7, "total_comments": 7}
+    assert store.get_state("video")["newest_comment_id"] == "c7"
+
+
+def test_incremental_sync_stops_at_the_first_known_comment(store):
+    youtube = FakeYoutube(range(1, 11))
+    store.sync(youtube, "video")
+    youtube.post(11, 12, 13, 14)
+
+    comments, stats = store.sync(youtube, "video")
+
+    # Page 1: c14 c13 c12 (nouveaux); page 2: c11 nouveau puis c10 connu -> arrêt
+    assert stats == {"mode": "incremental", "api_calls": 2, "new_comments": 4, "total_comments": 14}
+    assert ids(comments) == [f"c{i}" for i in range(14, 0, -1)]
+    assert store.get_state("video")["newest_comment_id"] == "c14"
+
+
+def test_incremental_sync_without_new_comments_reads_one_page(store):
+    youtube = FakeYoutube(range(1, 11))
+    store.sync(youtube, "video")
+
+    comments, stats = store.sync(youtube, "video")
+
+    assert stats["mode"] == "incremental"
+    assert stats["api_calls"] == 1
+    assert stats["new_comments"] == 0
+    assert len(comments) == 10
+
+
+def test_incremental_sync_yields_only_new_comments(store):
+    youtube = FakeYoutube(range(1, 5))
+    store.sync(youtube, "video")
+    youtube.post(5, 6)
+
+    pages = list(store.iter_sync_pages(youtube, "video"))
+
+    assert [ids(page) for page in pages] == [["c6", "c5"]]
+
+
+def test_known_comments_on_the_last_page_are_refreshed(store):
+    youtube = FakeYoutube(range(1, 5))
+    store.sync(youtube, "video")
+    youtube.threads[0] = make_thread(4, likes=42)
+    youtube.post(5)
+
+    comments, _ = store.sync(youtube, "video")
+
+    by_id = {c['id']: c for c in comments}
+    assert by_id["c4"]["likeCount"] == 42
+    assert by_id["c5"]["likeCount"] == 0
+
+
+def test_incremental_sync_keeps_deleted_comments(store):
+    youtube = FakeYoutube(range(1, 5))
+    store.sync(youtube, "video")
+    youtube.delete(2)
+
+    comments, _ = store.sync(youtube, "video")
+
+    assert "c2" in ids(comments)
+
+
+def test_full_refresh_drops_deleted_comments(store):
+    youtube = FakeYoutube(range(1, 8))
+    store.sync(youtube, "video")
+    youtube.delete(2)
+    youtube.delete(6)
+
+    comments, stats = store.sync(youtube, "video", full_refresh=True)
+
+    assert stats["mode"] == "full"
+    assert stats["api_calls"] == 2
+    assert ids(comments) == ["c7", "c5", "c4", "c3", "c1"]
+
+
+def test_old_sync_state_triggers_a_full_refresh(store, monkeypatch):
+    youtube = FakeYoutube(range(1, 5))
+    store.sync(youtube, "video")
+    youtube.delete(1)
+    monkeypatch.setattr(comment_store, 'COMMENT_FULL_REFRESH_AGE', -1)
+
+    comments, stats = store.sync(youtube, "video")
+
+    assert stats["mode"] == "full"
+    assert ids(comments) == ["c4", "c3", "c2"]
+
+
+def test_interrupted_full_sync_is_redone_entirely(store):
+    youtube = FakeYoutube(range(1, 8))
+    pages = store.iter_sync_pages(youtube, "video")
+    next(pages)
+    pages.close()
+
+    # Pas de point de reprise enregistré: la synchro suivante repart du début
+    assert store.get_state("video") is None
+    comments, stats = store.sync(youtube, "video")
+    assert stats["mode"] == "full"
+    assert len(comments) == 7
+
+
+def test_videos_are_stored_separately(store):
+    store.sync(FakeYoutube(range(1, 4)), "video_a")
+    store.sync(FakeYoutube(range(10, 12)), "video_b")
+
+    assert ids(store.load("video_a")) == ["c3", "c2", "c1"]
+    assert ids(store.load("video_b")) == ["c11", "c10"]
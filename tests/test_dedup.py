@@ -0,0 +1,108 @@
+"""Regroupement des quasi-doublons (LSH puis similarité cosinus, composantes connexes)."""
+import numpy as np
+
+from services import dedup
+from services.dedup import collapse_near_duplicates, no_duplicates
+
+
+def random_embeddings(n_points, dim=64, seed=0):
+    return np.random.default_rng(seed).normal(size=(n_points, dim)).astype(np.float32)
+
+
+def test_distinct_comments_are_kept_apart():
+    texts = [f"commentaire {i}" for i in range(50)]
+    representatives, inverse, weights = collapse_near_duplicates(texts, random_embeddings(50))
+
+    assert list(representatives) == list(range(50))
+    assert list(inverse) == list(range(50))
+    assert weights.sum() == 50 and (weights == 1).all()
+
+
+def test_identical_texts_after_normalization_are_grouped():
+    texts = ["Super vidéo !", "autre chose", "  super   VIDÉO ! ", "encore autre chose"]
+    representatives, inverse, weights = collapse_near_duplicates(texts, random_embeddings(4))
+
+    assert list(representatives) == [0, 1, 3]
+    assert list(inverse) == [0, 1, 0, 2]
+    assert list(weights) == [2, 1, 1]
+
+
+def test_near_identical_embeddings_are_grouped():
+    embeddings = random_embeddings(6)
+    rng = np.random.default_rng(1)
+    embeddings[4] = embeddings[1] + 0.001 * rng.normal(size=embeddings.shape[1])
+    embeddings[5] = embeddings[1] + 0.001 * rng.normal(size=embeddings.shape[1])
+    texts = [f"texte {i}" for i in range(6)]
+
+    representatives, inverse, weights = collapse_near_duplicates(texts, embeddings)
+
+    assert list(representatives) == [0, 1, 2, 3]
+    assert list(inverse) == [0, 1, 2, 3, 1, 1]
+    assert list(weights) == [1, 3, 1, 1]
+
+
+def test_groups_are_numbered_in_representative_order():
+    embeddings = random_embeddings(5)
+    embeddings[0] = embeddings[3]
+    embeddings[2] = embeddings[4]
+    texts = [f"texte {i}" for i in range(5)]
+
+    representatives, inverse, weights = collapse_near_duplicates(texts, embeddings)
+
+    assert list(representatives) == [0, 1, 2]
+    assert list(inverse) == [0, 1, 2, 0, 2]
+    assert list(weights) == [2, 1, 2]
+
+
+def test_bucket_larger_than_a_block_forms_a_single_group(monkeypatch):
+    # Les paires à cheval sur deux blocs de comparaison doivent aussi être trouvées (spam de concours copié-collé)
+    monkeypatch.setattr(dedup, 'DEDUP_MAX_BLOCK', 64)
+    rng = np.random.default_rng(2)
+    base = rng.normal(size=64)
+    embeddings = (base + 0.001 * rng.normal(size=(200, 64))).astype(np.float32)
+    texts = [f"Je participe au concours ! #{i}" for i in range(200)]
+
+    representatives, inverse, weights = collapse_near_duplicates(texts, embeddings)
+
+    assert list(representatives) == [0]
+    assert (inverse == 0).all()
+    assert list(weights) == [200]
+
+
+def test_bucket_larger_than_default_block():
+    rng = np.random.default_rng(3)
+    base = rng.normal(size=384)
+    n_points = 2 * dedup.DEDUP_MAX_BLOCK + 52
+    embeddings = (base + 0.001 * rng.normal(size=(n_points, 384))).astype(np.float32)
+    texts = [f"bot {i}" for i in range(n_points)]
+
+    _, _, weights = collapse_near_duplicates(texts, embeddings)
+
+    assert list(weights) == [n_points]
+
+
+def test_flood_of_duplicates_scales_linearly():
+    # Concours/copier-coller: des milliers de quasi-doublons tombent dans le même seau LSH
+    rng = np.random.default_rng(4)
+    base = rng.normal(size=384)
+    n_flood = 5000
+    embeddings = np.vstack([
+        base + 0.001 * rng.normal(size=(n_flood, 384)),
+        rng.normal(size=(20, 384)),
+    ]).astype(np.float32)
+    texts = ["Je participe !"] * (n_flood // 2) + [f"Je participe #{i}" for i in range(n_flood - n_flood // 2)]
+    texts += [f"autre {i}" for i in range(20)]
+
+    representatives, inverse, weights = collapse_near_duplicates(texts, embeddings)
+
+    assert list(representatives) == [0] + list(range(n_flood, n_flood + 20))
+    assert (inverse[:n_flood] == 0).all()
+    assert list(weights) == [n_flood] + [1] * 20
+
+
+def test_no_duplicates_is_the_identity_grouping():
+    representatives, inverse, weights = no_duplicates(4)
+
+    assert list(representatives) == [0, 1, 2, 3]
+    assert list(inverse) == [0, 1, 2, 3]
+    assert list(weights) == [1, 1, 1, 1]
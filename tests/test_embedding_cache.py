@@ -0,0 +1,153 @@
+"""Cache persistant d'embeddings: réutilisation des vecteurs, remise à zéro sur max_rows et lectures concurrentes."""
+import hashlib
+
+import numpy as np
+import pytest
+
+from services.embedding_cache import EmbeddingCache
+
+DIM = 8
+
+
+class FakeModel:
+    """Encodeur déterministe (vecteur dérivé du hash du texte) qui enregistre les textes encodés."""
+
+    def __init__(self, dim=DIM):
+        self.dim = dim
+        self.encoded = []
+
+    def vector(self, text):
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:4], "little")
+        return np.random.default_rng(seed).normal(size=self.dim).astype(np.float32)
+
+    def encode(self, texts, show_progress_bar=False):
+        self.encoded.extend(texts)
+        return np.stack([self.vector(text) for text in texts])
+
+
+@pytest.fixture
+def model():
+    return FakeModel()
+
+
+def make_cache(tmp_path, **kwargs):
+    return EmbeddingCache("modele/test", directory=str(tmp_path), **kwargs)
+
+
+def test_second_call_is_served_from_the_cache(tmp_path, model):
+    cache = make_cache(tmp_path)
+    texts = ["premier", "deuxième", "premier"]
+
+    first = cache.encode(model, texts)
+    model.encoded.clear()
+    second = cache.encode(model, texts)
+
+    assert model.encoded == []
+    assert second.dtype == np.float32
+    np.testing.assert_array_equal(first, second)
+    np.testing.assert_array_equal(second[0], model.vector("premier"))
+    assert cache.stats()["entries"] == 2
+    assert (cache.hits, cache.misses) == (3, 3)
+
+
+def test_only_unseen_texts_are_encoded(tmp_path, model):
+    cache = make_cache(tmp_path)
+    cache.encode(model, ["a", "b"])
+    model.encoded.clear()
+
+    vectors = cache.encode(model, ["b", "c", "  a  "])
+
+    # Les textes sont normalisés avant hachage: "  a  " réutilise l'entrée de "a"
+    assert model.encoded == ["c"]
+    np.testing.assert_array_equal(vectors, np.stack([model.vector(t) for t in ["b", "c", "a"]]))
+
+
+def test_cache_is_shared_by_instances_on_the_same_files(tmp_path, model):
+    make_cache(tmp_path).encode(model, ["a", "b"])
+    model.encoded.clear()
+
+    vectors = make_cache(tmp_path).encode(model, ["b", "a"])
+
+    assert model.encoded == []
+    np.testing.assert_array_equal(vectors, np.stack([model.vector("b"), model.vector("a")]))
+
+
+def test_float16_storage(tmp_path, model):
+    cache = make_cache(tmp_path, dtype="float16")
+    cache.encode(model, ["a"])
+
+    vectors = cache.encode(model, ["a"])
+
+    assert vectors.dtype == np.float32
+    np.testing.assert_allclose(vectors[0], model.vector("a"), atol=1e-2)
+
+
+def test_cache_is_reset_beyond_max_rows(tmp_path, model):
+    cache = make_cache(tmp_path, max_rows=3)
+    cache.encode(model, ["a", "b"])
+
+    vectors = cache.encode(model, ["c", "d"])
+
+    np.testing.assert_array_equal(vectors, np.stack([model.vector("c"), model.vector("d")]))
+    assert cache.stats()["entries"] == 2
+    assert cache._current_generation() == 1
+    # Les anciens vecteurs ont disparu, les nouveaux sont relus correctement depuis le début du fichier
+    model.encoded.clear()
+    vectors = cache.encode(model, ["a", "d"])
+    assert model.encoded == ["a"]
+    np.testing.assert_array_equal(vectors, np.stack([model.vector("a"), model.vector("d")]))
+
+
+def test_dimension_change_resets_the_cache(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.encode(FakeModel(dim=4), ["a"])
+    larger = FakeModel(dim=6)
+
+    vectors = cache.encode(larger, ["b"])
+    larger.encoded.clear()
+    again = cache.encode(larger, ["b"])
+
+    assert larger.encoded == []
+    np.testing.assert_array_equal(again, vectors)
+    assert cache._current_generation() == 1
+
+
+def test_reset_by_another_process_during_a_read_falls_back_to_encoding(tmp_path, model, monkeypatch):
+    cache = make_cache(tmp_path)
+    cache.encode(model, ["a", "b"])
+    # Autre worker sur les mêmes fichiers, dont l'ajout dépasse max_rows et vide le cache
+    other = make_cache(tmp_path, max_rows=2)
+    original_read = cache._read
+
+    def read_then_reset(rows, dim):
+        vectors = original_read(rows, dim)
+        other.encode(model, ["x", "y"])
+        return vectors
+
+    monkeypatch.setattr(cache, '_read', read_then_reset)
+    model.encoded.clear()
+
+    vectors = cache.encode(model, ["a", "b"])
+
+    # La lecture a eu lieu avant la remise à zéro mais la génération a changé: ré-encodage
+    assert model.encoded == ["x", "y", "a", "b"]
+    np.testing.assert_array_equal(vectors, np.stack([model.vector("a"), model.vector("b")]))
+
+
+def test_stale_rows_from_an_older_generation_are_not_returned(tmp_path, model, monkeypatch):
+    cache = make_cache(tmp_path)
+    cache.encode(model, ["a", "b"])
+    other = make_cache(tmp_path, max_rows=2)
+    original_lookup = cache._lookup
+
+    def lookup_then_reset(hashes):
+        result = original_lookup(hashes)
+        # Remise à zéro entre la lecture de l'index et celle du fichier: les lignes pointent sur x et y
+        other.encode(model, ["x", "y"])
+        return result
+
+    monkeypatch.setattr(cache, '_lookup', lookup_then_reset)
+
+    vectors = cache.encode(model, ["a", "b"])
+
+    np.testing.assert_array_equal(vectors, np.stack([model.vector("a"), model.vector("b")]))
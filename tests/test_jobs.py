@@ -0,0 +1,133 @@
+"""File de jobs d'analyse: exécution, avancement par étapes, jobs interrompus et expiration (SQLite temporaire)."""
+import threading
+import time
+
+import pytest
+
+from services import jobs
+from services.cache import sqlite_connection
+from services.jobs import JobQueue
+
+STAGES = ["embedding", "clustering", "naming"]
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(STAGES, max_workers=1, path=str(tmp_path / "jobs.sqlite3"))
+
+
+def wait_for(queue, job_id, statuses=("done", "failed"), timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id, with_result=True)
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} toujours '{job['status']}'")
+
+
+def set_job_row(queue, job_id, **fields):
+    assignments = ", ".join(f"{name} = ?" for name in fields)
+    with sqlite_connection(queue.path) as conn:
+        conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", list(fields.values()) + [job_id])
+
+
+def test_job_result_and_stages(queue):
+    def analysis(comments, progress):
+        progress("embedding", 0, len(comments))
+        progress("embedding", len(comments), len(comments))
+        progress("clustering")
+        return {"count": len(comments), "first": comments[0]}
+
+    job_id = queue.submit(analysis, ["é", "b", "c"])
+    job = wait_for(queue, job_id)
+
+    assert job["status"] == "done"
+    assert job["result"] == {"count": 3, "first": "é"}
+    assert job["error"] is None
+    assert job["progress"]["stage"] == "clustering"
+    assert job["progress"]["stages"] == {"embedding": "done", "clustering": "done", "naming": "pending"}
+
+
+def test_progress_is_visible_while_running(queue):
+    release = threading.Event()
+
+    def analysis(progress):
+        progress("embedding", 5, 10)
+        release.wait(5)
+        return None
+
+    job_id = queue.submit(analysis)
+    try:
+        deadline = time.time() + 5
+        while queue.get(job_id)["progress"]["done"] != 5 and time.time() < deadline:
+            time.sleep(0.01)
+        job = queue.get(job_id)
+    finally:
+        release.set()
+
+    assert job["status"] == "running"
+    assert job["progress"]["stage"] == "embedding"
+    assert (job["progress"]["done"], job["progress"]["total"]) == (5, 10)
+    assert job["progress"]["stages"]["embedding"] == "running"
+    assert "result" not in job
+    wait_for(queue, job_id)
+
+
+def test_failed_job_keeps_the_error(queue):
+    def analysis(progress):
+        progress("embedding")
+        raise ValueError("modèle indisponible")
+
+    job = wait_for(queue, queue.submit(analysis))
+
+    assert job["status"] == "failed"
+    assert job["error"] == "modèle indisponible"
+    assert job["result"] is None
+
+
+def test_unknown_job(queue):
+    assert queue.get("inconnu") is None
+
+
+def test_running_job_without_update_is_reported_interrupted(queue, monkeypatch):
+    job_id = queue.submit(lambda progress: None)
+    wait_for(queue, job_id)
+    # Worker arrêté en cours d'exécution: l'état 'running' n'est plus mis à jour
+    set_job_row(queue, job_id, status="running", updated_at=time.time() - 100)
+    monkeypatch.setattr(jobs, 'ANALYSIS_JOB_STALE_AFTER', 50)
+
+    job = queue.get(job_id)
+
+    assert job["status"] == "failed"
+    assert job["error"] == "Le job a été interrompu."
+
+
+def test_queued_job_is_never_reported_interrupted(queue, monkeypatch):
+    job_id = queue.submit(lambda progress: None)
+    wait_for(queue, job_id)
+    set_job_row(queue, job_id, status="queued", updated_at=time.time() - 100)
+    monkeypatch.setattr(jobs, 'ANALYSIS_JOB_STALE_AFTER', 50)
+
+    assert queue.get(job_id)["status"] == "queued"
+
+
+def test_jobs_are_shared_between_queues_on_the_same_file(queue):
+    job_id = queue.submit(lambda progress: {"ok": True})
+    wait_for(queue, job_id)
+    other_worker = JobQueue(STAGES, max_workers=1, path=queue.path)
+
+    assert other_worker.get(job_id, with_result=True)["result"] == {"ok": True}
+
+
+def test_expired_jobs_are_deleted_on_submit(queue, monkeypatch):
+    old_id = queue.submit(lambda progress: "ancien")
+    wait_for(queue, old_id)
+    set_job_row(queue, old_id, updated_at=time.time() - 100)
+    monkeypatch.setattr(jobs, 'ANALYSIS_JOB_TTL', 50)
+
+    new_id = queue.submit(lambda progress: "nouveau")
+    wait_for(queue, new_id)
+
+    assert queue.get(old_id) is None
+    assert queue.get(new_id, with_result=True)["result"] == "nouveau"
@@ -0,0 +1,37 @@
+"""Registre de modèles: disponibilité calculée sur les seules entrées préchargées."""
+from services.model_registry import ModelRegistry
+
+
+def make_registry():
+    registry = ModelRegistry()
+    registry.register('sentiment', lambda: "pipeline")
+    registry.register('semantic', lambda: "encoder")
+    registry.register('gemini', lambda: "client", fork_safe=False)
+    return registry
+
+
+def test_ready_without_requested_preload():
+    registry = make_registry()
+
+    assert registry.is_ready_for_traffic()
+    assert registry.expected() == []
+
+
+def test_ready_once_preloaded_models_are_loaded():
+    registry = make_registry()
+    thread = registry.warm_up(['sentiment', 'semantic', 'inconnu'], background=True)
+    thread.join()
+
+    assert registry.expected() == ['semantic', 'sentiment']
+    assert registry.is_ready_for_traffic()
+    # Gemini n'est pas préchargé: il reste 'not_loaded' sans bloquer la disponibilité
+    assert registry.status()['gemini']['status'] == 'not_loaded'
+
+
+def test_not_ready_while_a_preloaded_model_fails():
+    registry = make_registry()
+    registry.register('umap', lambda: 1 / 0)
+    registry.warm_up(['sentiment', 'umap'], background=False)
+
+    assert not registry.is_ready_for_traffic()
+    assert registry.status()['umap']['status'] == 'failed'